@@ -267,6 +267,7 @@ OPTIMIZED_STRATEGY_CONFIG = {
     'deepseek_mode': 'realtime_only',      # 模式: 'realtime_only'(仅实盘), 'backtest_only'(仅回测), 'both'(都启用)
     'deepseek_weight': 0.6,                # DeepSeek信号权重 (0-1)
     'cache_timeout': 60 * 10,         # 缓存超时时间(秒) - 10分钟
+    'deepseek_cache_ttl': 10,              # 信号整合器分析结果短时缓存(秒)
     
 }
 
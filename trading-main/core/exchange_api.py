@@ -9,6 +9,9 @@ import time
 import hmac
 import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Tuple
 from config import BINANCE_API_CONFIG
 
@@ -22,13 +25,30 @@ def get_current_ip() -> str:
         pass
     return "IP获取失败"
 
+def create_http_session() -> requests.Session:
+    """
+    创建复用连接池的HTTP会话
+    
+    同一会话内的请求复用TCP+TLS连接，避免每次下单前后的REST请求都重新握手；
+    仅对网关类错误(502/503/504)做少量重试，下单等POST请求不会被重试。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    return session
+
 class RealExchangeAPI:
     """真实交易所API类 - 仅支持主网"""
     
-    def __init__(self, api_key: str = None, secret_key: str = None):
-        """初始化交易所API"""
+    def __init__(self, api_key: str = None, secret_key: str = None, session: requests.Session = None):
+        """初始化交易所API，session为空时自动创建复用连接的HTTP会话"""
         self.api_key = api_key
         self.secret_key = secret_key
+        self.session = session or create_http_session()
         
         # 从配置中获取主网API设置
         api_config = BINANCE_API_CONFIG['MAINNET']
@@ -100,9 +120,9 @@ class RealExchangeAPI:
             
             # 发送请求
             if method.upper() == 'GET':
-                response = requests.get(url, headers=headers, timeout=self.timeout)
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
             elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, timeout=self.timeout)
+                response = self.session.post(url, headers=headers, timeout=self.timeout)
             else:
                 raise ValueError(f"不支持的HTTP方法: {method}")
             
@@ -121,7 +141,7 @@ class RealExchangeAPI:
         """测试API连接"""
         try:
             url = f"{self.base_url}/fapi/{self.api_version}/ticker/price?symbol=ETHUSDT"
-            response = requests.get(url, timeout=self.timeout)
+            response = self.session.get(url, timeout=self.timeout)
             
             if response.status_code == 200:
                 data = response.json()
@@ -134,10 +154,34 @@ class RealExchangeAPI:
         except Exception as e:
             return False, f"API连接失败: {str(e)}"
     
+    def warmup(self, symbol: str = 'ETHUSDT') -> Dict:
+        """
+        并发完成连接测试、余额和持仓查询
+        
+        余额与持仓来自同一个 /v2/account 响应，只需一次签名请求，
+        与公共行情连接测试并行发出，耗时约为单次请求往返时间。
+        
+        Returns:
+            {'connection': (success, message), 'balance': 余额字典, 'position': 仓位字典}
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            connection_future = executor.submit(self.test_connection)
+            account_future = executor.submit(self._make_api_request, "/v2/account")
+            connection = connection_future.result()
+            account_result = account_future.result()
+        
+        return {
+            'connection': connection,
+            'balance': self._parse_balance(account_result),
+            'position': self._parse_position(account_result, symbol)
+        }
+    
     def get_balance(self) -> Dict:
         """获取合约账户余额"""
-        result = self._make_api_request(f"/v2/account")
-        
+        return self._parse_balance(self._make_api_request(f"/v2/account"))
+    
+    def _parse_balance(self, result: Dict) -> Dict:
+        """从账户信息响应中解析余额"""
         if result['success']:
             account_data = result['data']
             total_balance = float(account_data.get('totalWalletBalance', 0))
@@ -165,8 +209,10 @@ class RealExchangeAPI:
     
     def get_position(self, symbol: str = 'ETHUSDT') -> Dict:
         """获取当前仓位"""
-        result = self._make_api_request(f"/v2/account")
-        
+        return self._parse_position(self._make_api_request(f"/v2/account"), symbol)
+    
+    def _parse_position(self, result: Dict, symbol: str) -> Dict:
+        """从账户信息响应中解析指定交易对的仓位"""
         if result['success']:
             account_data = result['data']
             positions = account_data.get('positions', [])
@@ -74,6 +74,9 @@ class SharpeOptimizedStrategy:
         # 状态变量初始化
         self._init_state_variables()
         
+        # 持仓变化监听器（外部缓存持仓状态时注册）
+        self._position_listeners = []
+        
         # 加载历史状态
         self.load_strategy_status()
 
@@ -774,6 +777,7 @@ class SharpeOptimizedStrategy:
         """代理到风险管理器的持仓信息更新"""
         self.risk_manager.update_position_info(position, entry_price, current_price, current_time, entry_signal_score, leverage, margin_value)
         # 仓位状态已统一由 risk_manager 管理，无需同步回策略状态
+        self._notify_position_listeners()
         
         # 自动保存策略状态
         self.save_strategy_status()
@@ -785,11 +789,13 @@ class SharpeOptimizedStrategy:
     def set_position_quantity(self, quantity):
         """代理到风险管理器的持仓数量设置"""
         self.risk_manager.set_position_quantity(quantity)
+        self._notify_position_listeners()
     
     def set_leverage(self, leverage):
         """代理到风险管理器的杠杆倍数设置"""
         self.risk_manager.set_leverage(leverage)
         logger.info(f"策略杠杆倍数已设置为: {leverage}x")
+        self._notify_position_listeners()
         # 自动保存策略状态
         self.save_strategy_status()
     
@@ -800,6 +806,7 @@ class SharpeOptimizedStrategy:
             if new_leverage != self.risk_manager.leverage:
                 self.risk_manager.set_leverage(new_leverage)
                 logger.info(f"策略杠杆倍数已从交易系统更新为: {new_leverage}x")
+                self._notify_position_listeners()
                 # 自动保存策略状态
                 self.save_strategy_status()
                 return True
@@ -1786,6 +1793,19 @@ class SharpeOptimizedStrategy:
             'current_price': self.risk_manager.current_price
         }
     
+    def register_position_listener(self, callback):
+        """注册持仓变化监听器，持仓/数量/杠杆变化后以 callback(strategy) 形式调用"""
+        if callback not in self._position_listeners:
+            self._position_listeners.append(callback)
+    
+    def _notify_position_listeners(self):
+        """通知所有持仓变化监听器"""
+        for callback in self._position_listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.warning(f"持仓变化监听器执行失败: {e}")
+    
     # 添加获取仓位信息的代理方法
     def get_position(self):
         """获取当前仓位"""
@@ -1865,6 +1885,7 @@ class SharpeOptimizedStrategy:
         # 重置策略特有的状态变量
         self.current = None
         self.current_deepseek_data = None
+        self._notify_position_listeners()
         
         logger.info("策略持仓状态已重置")
 
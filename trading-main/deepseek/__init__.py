@@ -4,10 +4,23 @@ DeepSeek集成模块
 包含DeepSeek AI分析器和信号集成器，用于增强交易决策。
 """
 
-# 导入DeepSeek模块
-from .analyzer import DeepSeekAnalyzer
-from .signal_integrator import DeepSeekSignalIntegrator
-from .quick_demo import main as run_quick_demo
+import importlib
+
+# 按需导入DeepSeek模块，访问时才加载对应子模块（analyzer依赖pandas/numpy/requests）
+_LAZY_EXPORTS = {
+    'DeepSeekAnalyzer': ('.analyzer', 'DeepSeekAnalyzer'),
+    'DeepSeekSignalIntegrator': ('.signal_integrator', 'DeepSeekSignalIntegrator'),
+    'run_quick_demo': ('.quick_demo', 'main'),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module_name, attr = _LAZY_EXPORTS[name]
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # 导出主要类
 __all__ = [
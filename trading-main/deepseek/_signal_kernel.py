@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+DeepSeek信号整合标量内核
+
+逐条信号整合的分支计算，安装了numba时以nopython模式JIT编译，
+未安装时退化为普通Python函数，结果完全一致。
+"""
+
+from utils._njit import njit
+
+
+# 信号来源编码
+SOURCE_INTEGRATED = 0
+SOURCE_TRADITIONAL = 1
+SOURCE_DEEPSEEK = 2
+
+
+@njit(cache=True)
+def _clamp11(x):
+    """轻微加强评分(×1.1)并限制上限为1.0"""
+    y = x * 1.1
+    return y if y < 1.0 else 1.0
+
+
+@njit(cache=True)
+def integrate_scalar(t_sig, d_sig, t_score, d_score, t_trend, d_trend, t_base, d_base, w):
+    """
+    整合单条传统信号与DeepSeek信号
+
+    Args:
+        t_sig, d_sig: 传统/DeepSeek信号方向 (1, 0, -1)，DeepSeek信号应已过滤
+        t_score, d_score: 传统/DeepSeek综合评分
+        t_trend, d_trend: 传统/DeepSeek趋势评分
+        t_base, d_base: 传统/DeepSeek基础评分
+        w: DeepSeek信号权重 (0-1)
+
+    Returns:
+        (direction, score, trend_score, base_score, source) 元组
+    """
+    if t_sig == 0 and d_sig != 0:
+        # 传统信号为观望时，主要参考DeepSeek信号
+        return d_sig, d_score, d_trend, d_base, SOURCE_DEEPSEEK
+    if d_sig == 0 and t_sig != 0:
+        # DeepSeek信号为观望时，主要参考传统信号
+        return t_sig, t_score, t_trend, t_base, SOURCE_TRADITIONAL
+
+    if t_sig == d_sig:
+        # 方向一致（含双观望），加权后轻微加强
+        score = _clamp11(t_score * (1 - w) + d_score * w)
+        trend = _clamp11(t_trend * (1 - w) + d_trend * w)
+        base = _clamp11(t_base * (1 - w) + d_base * w)
+        return t_sig, score, trend, base, SOURCE_INTEGRATED
+
+    # 方向冲突，按权重取一方
+    if w > 0.5:
+        return d_sig, _clamp11(d_score), _clamp11(d_trend), _clamp11(d_base), SOURCE_INTEGRATED
+    return t_sig, t_score * 0.8, t_trend * 0.8, t_base * 0.8, SOURCE_INTEGRATED
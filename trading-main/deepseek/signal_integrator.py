@@ -11,13 +11,25 @@ DeepSeek信号整合器
 """
 
 import logging
-from re import S
 import time
-from typing import Dict, Any, Optional
-from .analyzer import DeepSeekAnalyzer
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
+from ._signal_kernel import integrate_scalar
 
 logger = logging.getLogger(__name__)
 
+# DeepSeek信号过滤器通过时的原因说明
+_PASS_REASON = 'DeepSeek信号过滤器通过'
+
+def _to_float(value) -> float:
+    """将评分统一转换为内置float，None视为0"""
+    return float(value) if value is not None else 0.0
+
+
+# 整合信号来源编码，对应 integrate_scalar 返回的 source 下标
+SIGNAL_SOURCES = ('integrated', 'traditional', 'deepseek')
+
+
 class DeepSeekSignalIntegrator:
     """
     DeepSeek信号整合器
@@ -33,8 +45,9 @@ class DeepSeekSignalIntegrator:
         """
         self.config = config or {}
         
-        # 初始化DeepSeek分析器
+        # 初始化DeepSeek分析器（按需导入，避免导入本模块时加载pandas/requests）
         try:
+            from .analyzer import DeepSeekAnalyzer
             self.deepseek_analyzer = DeepSeekAnalyzer()
             self.enabled = True
             logger.info(" DeepSeek信号整合器初始化成功")
@@ -58,8 +71,16 @@ class DeepSeekSignalIntegrator:
             'bearish': -0.4,         # 看跌阈值（负值）
             'strong_bearish': -0.7   # 强看跌阈值（负值）
         })
+        
+        # DeepSeek信号过滤阈值：多头评分需大于long_filter，空头评分需小于short_filter
+        self._long_thr = self.thresholds.get('long_filter', 0.3)
+        self._short_thr = self.thresholds.get('short_filter', -0.3)
+        
+        # 分析结果短时缓存 (时间戳, 分析结果)，避免紧密循环中重复调用分析器
+        self._cache = (0.0, None)
+        self._ttl = self.config.get('deepseek_cache_ttl', 10.0)
     
-    def get_deepseek_analysis(self, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
+    def get_deepseek_analysis(self, force_refresh: bool = False) -> Optional[Mapping[str, Any]]:
         """
         获取DeepSeek分析结果
         
@@ -67,18 +88,32 @@ class DeepSeekSignalIntegrator:
             force_refresh: 是否强制刷新缓存
             
         Returns:
-            DeepSeek分析结果字典，包含各项指标和评分
+            DeepSeek分析结果的只读映射(MappingProxyType)，包含各项指标和评分；
+            缓存期内多次调用返回同一对象，需要修改时请先 .copy()。
+            只读仅限顶层键，indicators等嵌套字典仍是可变的共享对象，调用方不应修改；
+            MappingProxyType不能被json/orjson序列化，写入信号等需要序列化的结构前先转为dict
         """
         if not self.enabled:
             return None
         
+        # 短时缓存命中时直接返回，强制刷新时使缓存失效
+        if force_refresh:
+            self._cache = (0.0, None)
+        else:
+            cached_at, cached_analysis = self._cache
+            if cached_analysis is not None and time.time() - cached_at < self._ttl:
+                return cached_analysis
+        
         try:
             # 直接调用analyzer的方法，缓存逻辑已在analyzer中处理
             analysis = self.deepseek_analyzer.get_real_time_analysis(force_refresh=force_refresh)
             
             if analysis and 'trend_score' in analysis:
                 logger.debug("✅ 成功获取DeepSeek分析结果")
-                return analysis
+                # 只读包装后缓存，调用方可安全共享同一份结果而无需防御性复制
+                frozen = MappingProxyType(analysis)
+                self._cache = (time.time(), frozen)
+                return frozen
             else:
                 logger.warning("❌ DeepSeek分析结果为空或格式错误")
                 return None
@@ -90,22 +125,25 @@ class DeepSeekSignalIntegrator:
     
    
     def integrate_with_traditional_signal(self, traditional_signal: Dict[str, Any], 
-                                        deepseek_weight: float = 0.3) -> Dict[str, Any]:
+                                        deepseek_weight: float = 0.3,
+                                        deepseek_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         将DeepSeek分析结果与传统信号整合
         
         Args:
             traditional_signal: 传统策略生成的信号
             deepseek_weight: DeepSeek信号的权重 (0-1)
+            deepseek_analysis: 预先获取的DeepSeek分析结果，为None时自动获取
             
         Returns:
-            整合后的信号字典
+            整合后的信号字典（即原地更新后的 traditional_signal，不再复制）
         """
         try:
             # 获取DeepSeek分析
-            deepseek_analysis = self.get_deepseek_analysis()
+            if deepseek_analysis is None:
+                deepseek_analysis = self.get_deepseek_analysis()
 
-            print(f"deepseek_analysis: {deepseek_analysis}")
+            logger.debug("deepseek_analysis: %s", deepseek_analysis)
             
             if not deepseek_analysis:
                 logger.warning("无法获取DeepSeek分析，使用传统信号")
@@ -125,92 +163,60 @@ class DeepSeekSignalIntegrator:
             d_base_score = deepseek_analysis.get('base_score', 0)
             
             # 添加调试日志
-            logger.debug(f"原始评分数据 - 传统信号: signal_score={t_signal_score}({type(t_signal_score)}), "
-                        f"trend_score={t_trend_score}({type(t_trend_score)}), "
-                        f"base_score={t_base_score}({type(t_base_score)})")
-            logger.debug(f"原始评分数据 - DeepSeek信号: signal_score={d_signal_score}({type(d_signal_score)}), "
-                        f"trend_score={d_trend_score}({type(d_trend_score)}), "
-                        f"base_score={d_base_score}({type(d_base_score)})")
-           
- 
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("原始评分数据 - 传统信号: signal_score=%s(%s), trend_score=%s(%s), base_score=%s(%s)",
+                             t_signal_score, type(t_signal_score), t_trend_score, type(t_trend_score),
+                             t_base_score, type(t_base_score))
+                logger.debug("原始评分数据 - DeepSeek信号: signal_score=%s(%s), trend_score=%s(%s), base_score=%s(%s)",
+                             d_signal_score, type(d_signal_score), d_trend_score, type(d_trend_score),
+                             d_base_score, type(d_base_score))
+            
+            # 统一转换评分类型（可能为numpy标量、Decimal、字符串或None），后续均为原生float运算
+            t_signal_score, t_trend_score, t_base_score = map(_to_float, (t_signal_score, t_trend_score, t_base_score))
+            d_signal_score, d_trend_score, d_base_score = map(_to_float, (d_signal_score, d_trend_score, d_base_score))
+            t_signal = int(t_signal or 0)
+            d_signal = int(d_signal or 0)
    
-            # DeepSeek评分过滤：多头评分>0.25，空头评分<-0.2
-            reason = 'DeepSeek信号过滤器通过'
-            if d_signal == 1 and d_signal_score <= 0.3:
+            # DeepSeek评分过滤：多头评分>long_filter，空头评分<short_filter
+            reason = _PASS_REASON
+            if d_signal == 1 and d_signal_score <= self._long_thr:
                 # 多头信号但评分不够，转为观望
                 d_signal = 0
-                reason = '多头信号被过滤：评分必须大于0.3分'
-                logger.debug(f"DeepSeek多头信号被过滤：评分{d_signal_score:.3f} <= 0.3")
-            elif d_signal == -1 and d_signal_score >= -0.3:
+                reason = f'多头信号被过滤：评分必须大于{self._long_thr}分'
+                logger.debug("DeepSeek多头信号被过滤：评分%.3f <= %s", d_signal_score, self._long_thr)
+            elif d_signal == -1 and d_signal_score >= self._short_thr:
                 # 空头信号但评分不够，转为观望
                 d_signal = 0
-                reason = '空头信号被过滤：评分必须小于-0.3分'
-                logger.debug(f"DeepSeek空头信号被过滤：评分{d_signal_score:.3f} >= -0.3")
-
-            # 计算综合评分
-            if t_signal == 0 and d_signal != 0:
-                # 传统信号为观望时，主要参考DeepSeek信号
-                integrated_score = d_signal_score
-                integrated_direction = d_signal
-                integrated_trend_score = d_trend_score
-                integrated_base_score = d_base_score
-                integrated_signal_from = 'deepseek'
-            elif d_signal == 0 and t_signal != 0:
-                # DeepSeek信号为观望时，主要参考传统信号
-                integrated_score = t_signal_score
-                integrated_direction = t_signal
-                integrated_trend_score = t_trend_score
-                integrated_base_score = t_base_score
-                integrated_signal_from = 'traditional'
-            else:
-                # 两个信号都有方向时，进行加权整合
-                integrated_signal_from = 'integrated'
-                integrated_score = (t_signal_score * (1 - deepseek_weight) + d_signal_score * deepseek_weight)
-                integrated_trend_score = (t_trend_score * (1 - deepseek_weight) + d_trend_score * deepseek_weight)
-                integrated_base_score = (t_base_score * (1 - deepseek_weight) + d_base_score * deepseek_weight)
-                
-                # 方向整合
-                if t_signal == d_signal:
-                    # 方向一致，加强信号
-                    integrated_direction = t_signal
-                    integrated_score = min(1.0, integrated_score * 1.1)  # 轻微加强
-                    integrated_trend_score = min(1.0, integrated_trend_score * 1.1) 
-                    integrated_base_score = min(1.0, integrated_base_score * 1.1)
-                else:
-                    # 方向冲突，降低信号强度
-                    if deepseek_weight > 0.5:
-                        integrated_direction = d_signal
-                        integrated_score = min(1.0, d_signal_score * 1.1)  # 轻微加强
-                        integrated_trend_score = min(1.0, d_trend_score * 1.1) 
-                        integrated_base_score = min(1.0, d_base_score * 1.1)
-                    else:
-                        integrated_direction = t_signal
-                        integrated_score = t_signal_score * 0.8  # 降低强度
-                        integrated_trend_score = t_trend_score * 0.8
-                        integrated_base_score = t_base_score * 0.8 
+                reason = f'空头信号被过滤：评分必须小于{self._short_thr}分'
+                logger.debug("DeepSeek空头信号被过滤：评分%.3f >= %s", d_signal_score, self._short_thr)
 
-            # 如果两个信号都为观望，则最终为观望
-            if t_signal == 0 and d_signal == 0:
-                integrated_direction = 0
-                integrated_signal_from = 'integrated'
+            # 计算综合评分（标量内核，安装numba时JIT编译）
+            (integrated_direction, integrated_score, integrated_trend_score,
+             integrated_base_score, source) = integrate_scalar(
+                t_signal, d_signal, t_signal_score, d_signal_score,
+                t_trend_score, d_trend_score, t_base_score, d_base_score,
+                deepseek_weight
+            )
+            integrated_signal_from = SIGNAL_SOURCES[source]
                 
-            # 构建整合后的信号增加项
-            integrated_signal = traditional_signal.copy()
+            # 原地写入整合结果，与错误分支保持一致，避免每次复制信号字典
+            integrated_signal = traditional_signal
             integrated_signal.update({
                 'signal': integrated_direction,
                 'signal_score': integrated_score,
                 'trend_score': integrated_trend_score,
                 'base_score': integrated_base_score,
                 'deepseek_status': 'integrated',
-                'deepseek_analysis': deepseek_analysis,
+                # 信号会被序列化（Web接口/状态文件），写入普通dict而非只读映射
+                'deepseek_analysis': dict(deepseek_analysis),
                 'signal_from': integrated_signal_from,
                 'reason': reason,
                 'indicators': deepseek_analysis.get('indicators', {})
             })
             
-            logger.debug(f"信号整合完成: 传统={t_signal}({t_signal_score:.3f}), "
-                        f"DeepSeek={d_signal}({d_signal_score:.3f})[过滤后], "
-                        f"整合={integrated_direction}({integrated_score:.3f})")
+            logger.debug("信号整合完成: 传统=%s(%.3f), DeepSeek=%s(%.3f)[过滤后], 整合=%s(%.3f)",
+                         t_signal, t_signal_score, d_signal, d_signal_score,
+                         integrated_direction, integrated_score)
             
             return integrated_signal
             
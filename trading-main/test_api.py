@@ -11,6 +11,10 @@ from dotenv import load_dotenv
 # 加载环境变量
 load_dotenv()
 
+# API密钥（导入时读取一次）
+API_KEY = os.getenv('BINANCE_API_KEY', '')
+SECRET_KEY = os.getenv('BINANCE_SECRET_KEY', '')
+
 try:
     from core.exchange_api import RealExchangeAPI
     from config import *
@@ -23,8 +27,8 @@ def test_api_connection():
     print("🔍 开始测试Binance API连接...")
     
     # 获取API密钥
-    api_key = os.getenv('BINANCE_API_KEY', '')
-    secret_key = os.getenv('BINANCE_SECRET_KEY', '')
+    api_key = API_KEY
+    secret_key = SECRET_KEY
     
     if not api_key or not secret_key:
         print("❌ API密钥未配置")
@@ -40,9 +44,12 @@ def test_api_connection():
         print(f"❌ API对象创建失败: {e}")
         return False
     
+    # 并发完成连接、账户和持仓查询
+    warmup = exchange_api.warmup('ETHUSDT')
+    
     # 测试基础连接
     print("\n📡 测试基础连接...")
-    success, message = exchange_api.test_connection()
+    success, message = warmup['connection']
     if success:
         print(f"✅ {message}")
     else:
@@ -51,7 +58,7 @@ def test_api_connection():
     
     # 测试账户信息
     print("\n💰 测试账户信息...")
-    balance_result = exchange_api.get_balance()
+    balance_result = warmup['balance']
     if balance_result['success']:
         print(f"✅ 账户余额: 总={balance_result['total']:.2f} USDT, 可用={balance_result['available']:.2f} USDT")
     else:
@@ -60,7 +67,7 @@ def test_api_connection():
     
     # 测试持仓信息
     print("\n📊 测试持仓信息...")
-    position = exchange_api.get_position('ETHUSDT')
+    position = warmup['position']
     if position:
         print(f"✅ 当前持仓: {position['size']} ETH, 杠杆: {position['leverage']}x")
     else:
@@ -8,12 +8,16 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# API密钥（导入时读取一次）
+API_KEY = os.getenv('BINANCE_API_KEY', '')
+SECRET_KEY = os.getenv('BINANCE_SECRET_KEY', '')
+
 def test_config():
     print("=== 交易系统配置测试 ===")
     
     # 1. 检查API密钥
-    api_key = os.getenv('BINANCE_API_KEY', '')
-    secret_key = os.getenv('BINANCE_SECRET_KEY', '')
+    api_key = API_KEY
+    secret_key = SECRET_KEY
     print(f"API密钥状态: {'已配置' if api_key and secret_key else '未配置'}")
     
     # 2. 检查用户配置文件
@@ -41,12 +45,15 @@ def test_config():
         print(f"API对象状态: {'已创建' if api_configured else '未创建'}")
         
         if api_configured:
+            # 并发完成连接测试和账户查询
+            warmup = ts.exchange_api.warmup()
+            
             # 测试API连接
-            success, message = ts.exchange_api.test_connection()
+            success, message = warmup['connection']
             print(f"API连接测试: {'成功' if success else '失败'} - {message}")
             
             # 测试账户信息
-            balance = ts.exchange_api.get_balance()
+            balance = warmup['balance']
             if balance['success']:
                 print(f"账户余额: 总={balance['total']:.2f} USDT, 可用={balance['available']:.2f} USDT")
             else:
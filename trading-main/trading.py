@@ -8,13 +8,18 @@
 import os
 import sys
 import time
+import queue
+import atexit
 import signal
 import logging
 import argparse
 import threading
-import json
+import collections
 import requests
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -26,24 +31,194 @@ try:
 
     from utils.telegram_notifier import notify_signal, notify_trade, notify_status, notify_error
     from utils.fix_config import (
-    apply_user_config, save_trade_history, load_trade_history
+    apply_user_config, compact_trade_history, load_trade_history, write_json_file,
+    open_trades_log, append_trade_record, ensure_json_dir, status_timestamp
 )
-    from core.exchange_api import RealExchangeAPI
+    from core.exchange_api import RealExchangeAPI, create_http_session
 except ImportError as e:
     print(f"导入模块失败: {e}")
     print("请确保在项目根目录运行此脚本")
     sys.exit(1)
 
+
+# 后台日志写入监听器（setup_logging首次调用时创建）
+_log_listener = None
+
+# 间隔计时使用整数纳秒的单调时钟，不受系统时间调整影响
+_now_ns = time.monotonic_ns
+_NS_PER_SEC = 1_000_000_000
+
+# 内存中保留的最近交易记录条数，完整历史在磁盘上
+TRADE_HISTORY_MAXLEN = 10000
+
+# 持仓/信号方向的显示文本
+_POSITION_DESC = {1: '多头', -1: '空头', 0: '无仓位'}
+_POSITION_SIDE = {1: 'long', -1: 'short'}
+_SIGNAL_DESC = {1: '做多', -1: '做空', 0: '观望'}
+
+
+def _make_qty_fn(leverage, min_eth):
+    """
+    生成固定杠杆下的交易数量计算函数，杠杆变化时重新生成
+    
+    Returns:
+        qty_fn(usdt_amount, price) -> (实际持仓价值, 交易数量, 最小交易量所需保证金)
+    """
+    inv_leverage = 1.0 / leverage
+    
+    def qty_fn(usdt_amount, price):
+        position_value = usdt_amount * leverage
+        return position_value, position_value / price, min_eth * price * inv_leverage
+    
+    return qty_fn
+
+
+@dataclass
+class TradeRecord:
+    """
+    单笔交易记录（固定字段，比dict更省内存）
+    
+    保留dict式的只读访问（record['pnl']、record.get('type')、'pnl' in record），
+    与从文件加载的dict记录混在同一交易历史中时调用方无需区分
+    """
+    __slots__ = (
+        'timestamp', 'type', 'amount', 'reason', 'price', 'quantity', 'signal_score',
+        'pnl', 'position', 'capital', 'available_capital', 'margin', 'leverage',
+    )
+    timestamp: datetime
+    type: str
+    amount: float
+    reason: str
+    price: float
+    quantity: float
+    signal_score: float
+    pnl: object
+    position: int
+    capital: float
+    available_capital: float
+    margin: float
+    leverage: float
+    
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key):
+        return key in self.__slots__
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+    
+    def to_dict(self):
+        """转换为普通dict"""
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+# 交易记录数值保留的小数位：金额/价格按USDT精度，数量按ETH精度
+PRICE_DP = 2
+QTY_DP = 6
+SCORE_DP = 4
+
+
+def _pack_trade(timestamp, trade_type, amount, reason, price, quantity, signal_score,
+                pnl, position, capital, available_capital, margin, leverage):
+    """按固定精度取整数值字段并生成交易记录，缩短序列化后的记录长度"""
+    return TradeRecord(
+        timestamp, trade_type, round(amount, PRICE_DP), reason, round(price, PRICE_DP),
+        round(quantity, QTY_DP), round(signal_score, SCORE_DP),
+        None if pnl is None else round(pnl, PRICE_DP), position,
+        round(capital, PRICE_DP), round(available_capital, PRICE_DP), round(margin, PRICE_DP), leverage
+    )
+
+
+def _new_trade_stats():
+    """完整交易历史的累计统计（交易总数、有盈亏记录的笔数、盈亏笔数与金额）"""
+    return {
+        'total_trades': 0,
+        'pnl_trades': 0,
+        'winning_trades': 0,
+        'losing_trades': 0,
+        'total_profit': 0.0,
+        'total_loss': 0.0,
+    }
+
+
+def _count_trade(stats, trade):
+    """把一笔交易计入累计统计，total_loss为亏损金额的绝对值之和"""
+    stats['total_trades'] += 1
+    pnl = trade.get('pnl')
+    if pnl is None:
+        return
+    stats['pnl_trades'] += 1
+    if pnl > 0:
+        stats['winning_trades'] += 1
+        stats['total_profit'] += pnl
+    elif pnl < 0:
+        stats['losing_trades'] += 1
+        stats['total_loss'] -= pnl
+
+
 class TradingSystem:
     """实盘交易系统核心类"""
-
+    
+    # 固定实例属性，新增属性需同时加入此列表
+    __slots__ = (
+        # 运行状态
+        'mode', 'running', '_stop_event', 'start_time', 'logger', '_log_counts', 'trading_thread',
+        # 组件
+        'strategy', 'data_loader', 'exchange_api', 'real_trading', '_http', '_exchange_flat',
+        # 策略方法（绑定策略时解析一次）
+        '_calc_pnl', '_check_risk', '_should_open', '_update_pos_info', '_set_pos_qty', '_cooldown_should_skip',
+        # 资金管理
+        'initial_capital', 'current_capital', 'available_capital',
+        'position_size_percent', 'max_position_size', 'min_position_size', 'signal_check_interval',
+        'daily_trades', 'daily_pnl', 'total_pnl', 'last_reset_date',
+        # 交易状态
+        'last_signal', 'last_trade_time', 'trade_count', 'trade_history', '_history_lock', '_trade_stats',
+        'heartbeat_interval', 'position_monitor_interval', 'last_position_update',
+        '_trades_log', '_flush_lock', '_flush_timer',
+        '_last_notified_signal', '_last_notified_score', '_last_notify_ns',
+        '_trades_dirty', '_trades_pending', '_last_flush_ns', '_flush_interval', '_flush_threshold',
+        '_last_checkpoint_ns', '_checkpoint_interval', '_checkpoint_count',
+        '_checkpoint_max_lines',
+        '_write_q', '_writer_thread', '_journaled_count',
+        # 缓存
+        '_pos_cache', '_qty_fn', '_tick_now', '_tick_ns', '_load_klines', '_cached_market_data',
+        '_last_price', '_last_row_dict', '_last_sig_data', '_last_sig_key', '_last_sig',
+        '_signal_monitor', '_get_current_signal',
+        # 配置快照
+        '_symbol', '_capital_config', '_config_leverage', '_min_usdt', '_min_eth', '_default_price',
+    )
     
     def __init__(self, mode='service'):
         """初始化交易系统"""
         self.mode = mode
         self.running = False  # 初始化为False，等待start()方法启动
+        self._stop_event = threading.Event()  # stop()时置位，唤醒所有等待中的循环
         self.start_time = datetime.now()
         
+        # 持仓状态缓存 - 由策略的持仓变化事件刷新，避免每次读取都查询策略
+        self._pos_cache = {'position': 0, 'entry': 0.0, 'qty': 0.0, 'lev': 1.0, 'dirty': True}
+        
+        # 交易循环时钟 - 每次循环开始时读取一次，循环外为None
+        self._tick_now = None
+        self._tick_ns = None
+        
+        # 最近一次取到的K线数据及其最新一行（收盘价与整行数据）
+        self._cached_market_data = None
+        self._last_price = None
+        self._last_row_dict = None
+        
+        # Web界面信号缓存 - 同一份K线数据重复请求时直接复用上次的策略信号
+        self._last_sig_data = None
+        self._last_sig_key = None
+        self._last_sig = None
+        
+        # 服务模式的信号监控器，首次进入服务模式时创建，重启后复用
+        self._signal_monitor = None
+        self._get_current_signal = None
+        
         # 加载用户配置
         try:
             success, message = apply_user_config()
@@ -54,9 +229,15 @@ class TradingSystem:
         except Exception as e:
             print(f"加载用户配置失败: {e}")
         
+        # 缓存交易中反复读取的配置项
+        self._load_config_snapshot()
+        
         # 初始化日志
         self.setup_logging()
         
+        # 初始化通知队列
+        self.setup_notifications()
+        
         # 初始化真实交易API
         self.setup_real_trading()
         
@@ -77,26 +258,75 @@ class TradingSystem:
         
         self.logger.info(f"🚀 交易系统初始化完成 - 模式: {mode}")
     
+    def _load_config_snapshot(self):
+        """读取交易配置快照，交易路径直接读取实例属性而不再逐次查询配置字典"""
+        capital_config = TRADING_CONFIG.get('CAPITAL_CONFIG', {})
+        self._symbol = TRADING_CONFIG.get('SYMBOL', 'ETHUSDT')
+        self._capital_config = dict(capital_config)
+        self._config_leverage = capital_config.get('LEVERAGE', 8)
+        self._min_usdt = 10.0  # 最小10 USDT
+        self._min_eth = 0.001  # 最小交易数量
+        self._default_price = 3000.0  # 无法获取价格时的默认价格
+    
+    def reload_config(self):
+        """重新应用用户配置并刷新配置快照（供Web界面修改配置后调用）"""
+        success, message = apply_user_config()
+        self._load_config_snapshot()
+        self._pos_cache['dirty'] = True
+        if hasattr(self, '_load_klines'):
+            self._load_klines.cache_clear()
+        self.logger.info(f"🔄 配置已重新加载: {message}")
+        return success, message
+    
+    def _begin_tick(self):
+        """开始一次交易循环，缓存本次循环的当前时间"""
+        self._tick_now = datetime.now()
+        self._tick_ns = _now_ns()
+        return self._tick_now
+    
+    def _end_tick(self):
+        """结束一次交易循环，之后的时间读取回退到实时时钟"""
+        self._tick_now = None
+        self._tick_ns = None
+    
+    def _now(self):
+        """当前时间：交易循环内返回本次循环的缓存时间，循环外返回实时时间"""
+        return self._tick_now or datetime.now()
+    
     @property
     def current_position(self):
-        """从策略获取当前持仓状态"""
-        if hasattr(self, 'strategy') and hasattr(self.strategy, 'get_position'):
-            return self.strategy.get_position()
-        return 0
+        """当前持仓状态（策略持仓的缓存）"""
+        cache = self._pos_cache
+        if cache['dirty']:
+            self._refresh_position_cache()
+        return cache['position']
     
     @property
     def position_entry_price(self):
-        """从策略获取开仓价格"""
-        if hasattr(self, 'strategy') and hasattr(self.strategy, 'get_entry_price'):
-            return self.strategy.get_entry_price()
-        return 0.0
+        """开仓价格（策略持仓的缓存）"""
+        cache = self._pos_cache
+        if cache['dirty']:
+            self._refresh_position_cache()
+        return cache['entry']
     
     @property
     def position_quantity(self):
-        """从策略获取持仓数量"""
-        if hasattr(self, 'strategy') and hasattr(self.strategy, 'get_position_quantity'):
-            return self.strategy.get_position_quantity()
-        return 0.0
+        """持仓数量（策略持仓的缓存）"""
+        cache = self._pos_cache
+        if cache['dirty']:
+            self._refresh_position_cache()
+        return cache['qty']
+    
+    def _refresh_position_cache(self, strategy=None):
+        """从策略同步持仓缓存，作为策略持仓变化监听器调用"""
+        strategy = strategy or getattr(self, 'strategy', None)
+        cache = self._pos_cache
+        cache['position'] = strategy.get_position() if hasattr(strategy, 'get_position') else 0
+        cache['entry'] = strategy.get_entry_price() if hasattr(strategy, 'get_entry_price') else 0.0
+        cache['qty'] = strategy.get_position_quantity() if hasattr(strategy, 'get_position_quantity') else 0.0
+        cache['lev'] = self._read_leverage()
+        self._qty_fn = _make_qty_fn(cache['lev'], self._min_eth)
+        cache['dirty'] = False
     
     def _calculate_ratio(self, current_price, leverage=1.0):
         """
@@ -111,44 +341,32 @@ class TradingSystem:
                 多头时：价格上涨为正数，下跌时为负数
                 空头时：价格上涨为负数，下跌时为正数
         """
-        if self.current_position == 0 or self.position_entry_price == 0:
+        if self._pos_cache['dirty']:
+            self._refresh_position_cache()
+        direction = self._pos_cache['position']
+        entry = self._pos_cache['entry']
+        if not (direction and entry):
             return 0.0
         
-        # 计算价格变动百分比
-        price_change_pct = (current_price - self.position_entry_price) / self.position_entry_price
-        
-        # 根据持仓方向计算盈亏比例
-        if self.current_position == 1:  # 多头
-            # 多头：价格上涨时为正数，价格下跌时为负数
-            ratio = price_change_pct * leverage
-        elif self.current_position == -1:  # 空头
-            # 空头：价格上涨时为负数，价格下跌时为正数
-            ratio = -price_change_pct * leverage
-        else:
-            return 0.0
-        
-        return ratio
+        # 持仓方向(1/-1)乘以价格变动百分比，多空统一为一个表达式
+        return direction * (current_price - entry) / entry * leverage
     
-    def get_leverage(self):
-        """获取当前杠杆倍数"""
-        # 从策略获取当前杠杆倍数（确保同步）
-        if hasattr(self, 'strategy') and hasattr(self.strategy, 'leverage'):
-            return self.strategy.leverage
-        return 1.0  # 默认杠杆倍数
-
     def set_position(self, position, entry_price=None, current_price=None):
         """设置策略的持仓状态"""
         if hasattr(self, 'strategy'):
-            if hasattr(self.strategy, 'update_position_info'):
+            if self._update_pos_info is not None:
+                # 策略更新后通过持仓监听器写回缓存
                 margin_used = self.get_margin_used()
-                self.strategy.update_position_info(position, entry_price or 0, current_price or 0, datetime.now(), 0.0, margin_value=margin_used)
+                self._update_pos_info(position, entry_price or 0, current_price or 0, self._now(), 0.0, margin_value=margin_used)
             else:
                 self.strategy.position = position
                 if entry_price is not None:
                     self.strategy.entry_price = entry_price
+                self._refresh_position_cache()
     
     def setup_logging(self):
         """设置日志系统"""
+        self._log_counts = {}
         log_dir = Path(LOGGING_CONFIG.get('LOG_DIR', 'logs'))
         log_dir.mkdir(exist_ok=True)
         
@@ -164,19 +382,24 @@ class TradingSystem:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             log_file = log_dir / f"trading_other.log"
         
-        # 配置日志格式
-        log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        
-        # 配置日志处理器
-        handlers = [logging.FileHandler(log_file, encoding='utf-8')]
-        if LOGGING_CONFIG.get('CONSOLE_OUTPUT', True):
-            handlers.append(logging.StreamHandler())
-            
-        logging.basicConfig(
-            level=getattr(logging, LOGGING_CONFIG.get('LEVEL', 'INFO')),
-            format=log_format,
-            handlers=handlers
-        )
+        # 日志处理器只在进程内配置一次：交易线程只把记录放入队列，
+        # 文件和控制台写入由后台线程完成，避免磁盘I/O阻塞交易循环
+        global _log_listener
+        root_logger = logging.getLogger()
+        if _log_listener is None and not root_logger.handlers:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handlers = [logging.FileHandler(log_file, encoding='utf-8')]
+            if LOGGING_CONFIG.get('CONSOLE_OUTPUT', True):
+                handlers.append(logging.StreamHandler())
+            for handler in handlers:
+                handler.setFormatter(formatter)
+            
+            log_queue = queue.Queue(-1)
+            root_logger.addHandler(QueueHandler(log_queue))
+            root_logger.setLevel(getattr(logging, LOGGING_CONFIG.get('LEVEL', 'INFO')))
+            _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            _log_listener.start()
+            atexit.register(_log_listener.stop)
         
         # 配置日志过滤
         from utils import configure_logging
@@ -185,8 +408,16 @@ class TradingSystem:
         self.logger = logging.getLogger('TradingSystem')
         self.logger.info(f"📝 日志系统初始化完成: {log_file}")
     
+    def _log_every_n(self, key, n):
+        """限频日志：同一key每n次调用只返回一次True（首次调用即为True）"""
+        count = self._log_counts.get(key, 0)
+        self._log_counts[key] = count + 1
+        return count % n == 0
+    
     def setup_real_trading(self):
         """初始化真实交易API"""
+        # 交易所是否为空仓，None表示未知（下单前需查询）
+        self._exchange_flat = None
         try:
             # 首先尝试从保存的配置中加载交易模式
             from utils.fix_config import load_user_config
@@ -216,10 +447,12 @@ class TradingSystem:
                 self.exchange_api = None
                 return
             
-            # 初始化真实交易API
+            # 初始化真实交易API，共享同一个HTTP会话以复用连接
+            self._http = create_http_session()
             self.exchange_api = RealExchangeAPI(
                 api_key=api_key,
-                secret_key=secret_key
+                secret_key=secret_key,
+                session=self._http
             )
             self.exchange_api.set_logger(self.logger)
             
@@ -247,11 +480,12 @@ class TradingSystem:
     def _initialize_margin_and_leverage(self):
         """初始化保证金类型和杠杆设置"""
         try:
-            symbol = TRADING_CONFIG.get('SYMBOL', 'ETHUSDT')
+            symbol = self._symbol
             
-            # 检查当前持仓状态
+            # 检查当前持仓状态，并记录供后续下单使用
             current_position = self.exchange_api.get_position(symbol)
             current_size = current_position.get('size', 0)
+            self._exchange_flat = (current_size == 0)
             
             if current_size == 0:
                 # 只有在没有开仓时才设置保证金类型和杠杆
@@ -287,6 +521,7 @@ class TradingSystem:
         try:
             # 数据加载器
             self.data_loader = DataLoader()
+            self._load_klines = lru_cache(maxsize=4)(self._fetch_klines)
             self.logger.info("数据加载器初始化完成")
             
             # 交易策略 - 将系统模式映射为策略模式
@@ -296,6 +531,11 @@ class TradingSystem:
                 data_loader=self.data_loader,
                 mode=strategy_mode  # 传递策略运行模式
             )
+            self._bind_strategy(self.strategy)
+            
+            # 注册持仓变化监听器，持仓缓存随策略状态变化刷新
+            self.strategy.register_position_listener(self._refresh_position_cache)
+            self._pos_cache['dirty'] = True
             
             # 同步杠杆倍数到策略
             self.strategy.update_leverage_from_trading_system(self)
@@ -317,6 +557,15 @@ class TradingSystem:
             self.logger.error(f"组件初始化失败: {e}")
             raise
     
+    def _bind_strategy(self, strategy):
+        """解析并缓存策略的可选方法，调用处只需判断是否为None"""
+        self._calc_pnl = getattr(strategy, 'calculate_unrealized_pnl', None)
+        self._check_risk = getattr(strategy, 'check_risk_management', None)
+        self._should_open = getattr(strategy, 'should_open_position', None)
+        self._update_pos_info = getattr(strategy, 'update_position_info', None)
+        self._set_pos_qty = getattr(strategy, 'set_position_quantity', None)
+        self._cooldown_should_skip = getattr(getattr(strategy, 'cooldown_manager', None), 'should_skip_trade', None)
+    
     def setup_signal_handlers(self):
         """设置信号处理器"""
         # 在web模式下跳过信号处理，避免线程问题
@@ -332,11 +581,8 @@ class TradingSystem:
     
     def setup_capital_management(self):
         """设置资金管理"""
-        # 重新导入config模块以确保获取最新的配置
-        import config
-        
         # 获取资金配置
-        capital_config = config.TRADING_CONFIG.get('CAPITAL_CONFIG', {})
+        capital_config = self._capital_config
         
         # 资金状态
         self.initial_capital = capital_config.get('INITIAL_CAPITAL', 10000) #初始资金
@@ -349,7 +595,7 @@ class TradingSystem:
         self.min_position_size = capital_config.get('MIN_POSITION_SIZE', 0.05)
         
         # 交易配置
-        self.signal_check_interval = config.TRADING_CONFIG.get('SIGNAL_CHECK_INTERVAL', 60)
+        self.signal_check_interval = TRADING_CONFIG.get('SIGNAL_CHECK_INTERVAL', 300)
 
         # 交易记录
         self.daily_trades = 0
@@ -363,14 +609,19 @@ class TradingSystem:
         self.logger.info(f"仓位配置 - 单次: {self.position_size_percent*100}%, 最大: {self.max_position_size*100}%")
     
     def get_leverage(self):
-        """统一获取杠杆倍数 - 优先从策略获取，回退到配置默认值"""
+        """统一获取杠杆倍数（缓存值，随策略持仓变化事件刷新）"""
+        cache = self._pos_cache
+        if cache['dirty']:
+            self._refresh_position_cache()
+        return cache['lev']
+    
+    def _read_leverage(self):
+        """读取杠杆倍数 - 优先从策略获取，回退到配置默认值"""
         if hasattr(self, 'strategy') and hasattr(self.strategy, 'leverage'):
             return self.strategy.leverage
         else:
             # 回退到配置默认值
-            import config
-            capital_config = config.TRADING_CONFIG.get('CAPITAL_CONFIG', {})
-            return capital_config.get('LEVERAGE', 8)
+            return self._config_leverage
     
     def setup_trading_state(self):
         """初始化交易状态"""
@@ -379,8 +630,32 @@ class TradingSystem:
         self.last_trade_time = None
         self.trade_count = 0
         
-        # 加载交易历史
+        # 加载交易历史，新成交的记录追加写入交易记录日志
         self.load_trade_history()
+        self._trades_log = open_trades_log()
+        
+        # 交易记录日志批量落盘：首条立即推送，之后满足时间或条数阈值才flush
+        self._trades_dirty = False
+        self._trades_pending = 0
+        self._last_flush_ns = 0
+        self._flush_interval = 5  # 秒
+        self._flush_threshold = 20  # 条
+        
+        # 交易历史快照定期压缩：把追加日志合并进trade_history.json
+        self._last_checkpoint_ns = _now_ns()
+        self._checkpoint_interval = 3600  # 秒
+        self._checkpoint_count = 0
+        self._checkpoint_max_lines = 10000  # 追加日志超过该条数时不等间隔提前压缩
+        
+        # 交易记录由后台写盘线程落盘，交易线程只负责入队
+        self._journaled_count = 0
+        self._write_q = queue.Queue()
+        self._writer_thread = None
+        self._start_writer()
+        
+        # 状态快照延迟写入：短时间内的多次状态变化合并为一次写文件
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
         
         # 系统监控
         self.heartbeat_interval = 30  # 心跳间隔(秒)
@@ -390,7 +665,7 @@ class TradingSystem:
     
     def reset_daily_counters(self):
         """重置每日计数器"""
-        current_date = datetime.now().date()
+        current_date = self._now().date()
         if not hasattr(self, 'last_reset_date') or self.last_reset_date != current_date:
             self.daily_trades = 0
             self.daily_pnl = 0.0
@@ -399,7 +674,6 @@ class TradingSystem:
     
     def signal_handler(self, signum, frame):
         """信号处理器"""
-        import traceback
         self.logger.info(f"📡 收到信号 {signum}，系统继续运行...")
         
         # 防止重复处理信号
@@ -407,48 +681,53 @@ class TradingSystem:
             self.logger.info("📡 系统未运行，忽略信号")
             return
     
-    def get_market_data(self):
-        """获取市场数据 - 带缓存优化"""
+    def get_market_data(self, days=100):
+        """获取市场数据 - 按10秒时间桶缓存，同一时间桶内不重复调用"""
         try:
-            # 添加调用频率限制
-            current_time = time.time()
-            if hasattr(self, '_last_market_data_call'):
-                time_since_last_call = current_time - self._last_market_data_call
-                if time_since_last_call < 10:  # 10秒内不重复调用
-                    if hasattr(self, '_cached_market_data') and self._cached_market_data is not None:
-                        self.logger.debug(f"⏰ 调用频率限制：距离上次调用仅 {time_since_last_call:.1f} 秒，使用缓存数据")
-                        return self._cached_market_data
-            
-            # 记录调用时间
-            self._last_market_data_call = current_time
-            
-            # 计算时间范围：获取最近1000条数据
-            end_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            start_date = (datetime.now() - timedelta(days=100)).strftime('%Y-%m-%d %H:%M:%S')
-            
-            # 获取最新K线数据（带缓存）
-            klines = self.data_loader.get_klines(
-                start_date=start_date,
-                end_date=end_date
-            )
+            now_ns = self._tick_ns if self._tick_ns is not None else _now_ns()
+            end_bucket = now_ns // (10 * _NS_PER_SEC) * 10
+            klines = self._load_klines(end_bucket, days)
             
             if klines is None or klines.empty:
                 self.logger.warning("无法获取市场数据")
                 return None
             
-            # 缓存数据
-            self._cached_market_data = klines
-            
-            # 记录数据获取信息
-            if not klines.empty:
-                self.logger.debug(f"📊 获取市场数据: {len(klines)} 条记录, 时间范围: {klines.index.min()} 至 {klines.index.max()}")
+            # 新数据时直接从各列数组取最新一行，同一份数据只取一次
+            if klines is not self._cached_market_data:
+                cols = klines.columns.tolist()
+                self._last_row_dict = dict(zip(cols, [klines[c].values[-1] for c in cols]))
+                self._last_price = float(self._last_row_dict['close'])
             
+            # 保留最近一次数据供Web界面读取
+            self._cached_market_data = klines
             return klines
             
         except Exception as e:
             self.logger.error(f"获取市场数据失败: {e}")
             return None
     
+    def _fetch_klines(self, end_bucket, days):
+        """
+        从数据加载器获取最近days天的K线数据
+        
+        Args:
+            end_bucket: 10秒对齐的时间戳，仅作为缓存键
+            days: 回看天数
+        """
+        now = datetime.now()
+        end_date = now.strftime('%Y-%m-%d %H:%M:%S')
+        start_date = (now - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        klines = self.data_loader.get_klines(
+            start_date=start_date,
+            end_date=end_date
+        )
+        
+        if klines is not None and not klines.empty and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("📊 获取市场数据: %d 条记录, 时间范围: %s 至 %s",
+                              len(klines), klines.index.min(), klines.index.max())
+        return klines
+    
     def execute_trade(self, signal_info, market_data=None):
         """执行交易"""
         try:
@@ -459,7 +738,9 @@ class TradingSystem:
             signal_score = signal_info.get('signal_score', 0)
             
             # 记录信号
-            self.logger.info(f"信号: {signal_value}, 综合评分: {signal_score:.4f}, 基础评分: {signal_info.get('base_score', 0):.4f}, 趋势评分: {signal_info.get('trend_score', 0):.4f}, 信号原因: {signal_info.get('reason', '')}, 投资建议: {signal_info.get('investment_advice', '')}")
+            self.logger.info("信号: %s, 综合评分: %.4f, 基础评分: %.4f, 趋势评分: %.4f, 信号原因: %s, 投资建议: %s",
+                             signal_value, signal_score, signal_info.get('base_score', 0), signal_info.get('trend_score', 0),
+                             signal_info.get('reason', ''), signal_info.get('investment_advice', ''))
             
             # 只处理开仓信号（平仓逻辑已在trading_loop中处理）
             if signal_value == 0 or self.current_position != 0:
@@ -479,22 +760,26 @@ class TradingSystem:
             trade_type = 'LONG' if signal_value == 1 else 'SHORT'
             order_side = 'buy' if signal_value == 1 else 'sell'
             
+            # 最新收盘价只从K线数据中取一次，向下传递
+            closes = market_data['close'].to_numpy()
+            last_close = float(closes[-1]) if closes.size else 0.0
+            
             # 执行交易
             success = self._execute_position_open(
                 trade_direction, trade_type, order_side, 
-                position_size_value, position_reason, signal_score, market_data
+                position_size_value, position_reason, signal_score, market_data, last_close
             )
             
             # 更新信号记录
             if success and signal_value != 0:
                 self.last_signal = signal_value
-                self.logger.debug(f"更新最新信号: {signal_value}")
+                self.logger.debug("更新最新信号: %s", signal_value)
             
         except Exception as e:
             self.logger.error(f"执行交易失败: {e}")
     
     def _execute_position_open(self, trade_direction, trade_type, order_side, 
-                              position_size_value, position_reason, signal_score, market_data):
+                              position_size_value, position_reason, signal_score, market_data, last_close):
         """执行开仓操作"""
         try:
             # 计算交易金额
@@ -505,7 +790,7 @@ class TradingSystem:
                 return False
             
             # 获取当前价格和计算ETH数量
-            current_price, eth_amount = self._calculate_trade_quantities(usdt_amount, market_data)
+            current_price, eth_amount = self._calculate_trade_quantities(usdt_amount, last_close)
             if current_price is None or eth_amount is None:
                 return False
             
@@ -523,40 +808,40 @@ class TradingSystem:
     
     def _validate_position_size(self, usdt_amount):
         """验证仓位大小"""
-        min_usdt_amount = 10.0  # 最小10 USDT
+        min_usdt_amount = self._min_usdt
         if usdt_amount < min_usdt_amount:
             self.logger.warning(f"计算仓位过小: {usdt_amount:.2f} USDT < {min_usdt_amount} USDT，使用最小仓位")
             return False
         return True
     
-    def _calculate_trade_quantities(self, usdt_amount, market_data):
-        """计算交易数量和价格"""
+    def _calculate_trade_quantities(self, usdt_amount, last_close):
+        """根据最新收盘价计算交易数量和价格"""
         try:
-            current_price = market_data['close'].iloc[-1] if not market_data.empty else 0
+            current_price = last_close
             if current_price <= 0:
-                current_price = 3000  # 默认价格
-                self.logger.warning("无法获取当前价格，使用默认价格3000 USDT")
+                current_price = self._default_price
+                self.logger.warning(f"无法获取当前价格，使用默认价格{current_price:.0f} USDT")
             
             # 🔧 修复杠杆计算逻辑
             # usdt_amount 是策略计算的仓位大小（如10%的可用资金）
             # 在杠杆交易中，这应该作为保证金，实际持仓价值 = 保证金 × 杠杆倍数
-            current_leverage = self.get_leverage()
-            actual_position_value = usdt_amount * current_leverage
-            
-            # 计算ETH数量 - 实际持仓价值除以价格
-            eth_amount = actual_position_value / current_price
+            # ETH数量 = 实际持仓价值 / 价格，计算函数随杠杆变化重新生成
+            if self._pos_cache['dirty']:
+                self._refresh_position_cache()
+            current_leverage = self._pos_cache['lev']
+            actual_position_value, eth_amount, required_usdt = self._qty_fn(usdt_amount, current_price)
             eth_amount = round(eth_amount, 3)  # 控制精度
             
-            self.logger.info(f"🔧 杠杆计算 - 策略仓位: {usdt_amount:.2f} USDT, 杠杆: {current_leverage}x, 实际持仓价值: {actual_position_value:.2f} USDT, ETH数量: {eth_amount:.4f}")
+            self.logger.info("🔧 杠杆计算 - 策略仓位: %.2f USDT, 杠杆: %sx, 实际持仓价值: %.2f USDT, ETH数量: %.4f",
+                             usdt_amount, current_leverage, actual_position_value, eth_amount)
             
             # 检查最小交易量
-            min_eth_amount = 0.001
+            min_eth_amount = self._min_eth
             if eth_amount < min_eth_amount:
-                required_usdt = min_eth_amount * current_price / current_leverage  # 考虑杠杆
                 if required_usdt <= self.available_capital:
                     usdt_amount = required_usdt
                     eth_amount = min_eth_amount
-                    self.logger.info(f"调整交易量: 保证金={usdt_amount:.2f} USDT, ETH={eth_amount:.6f}")
+                    self.logger.info("调整交易量: 保证金=%.2f USDT, ETH=%.6f", usdt_amount, eth_amount)
                 else:
                     self.logger.error(f"可用资金不足: 需要保证金{required_usdt:.2f} USDT，可用{self.available_capital:.2f} USDT")
                     return None, None
@@ -571,47 +856,45 @@ class TradingSystem:
                            usdt_amount, eth_amount, current_price, signal_score, market_data):
         """执行真实交易"""
         try:
-            symbol = TRADING_CONFIG.get('SYMBOL', 'ETHUSDT')
+            symbol = self._symbol
             
-            # 检查当前是否有开仓，如果有开仓则跳过保证金类型设置
-            current_position = self.exchange_api.get_position(symbol)
-            current_size = current_position.get('size', 0)
+            # 检查交易所是否为空仓 - 使用本地记录的状态，状态未知时才查询交易所
+            if self._exchange_flat is None:
+                current_size = self.exchange_api.get_position(symbol).get('size', 0)
+                self._exchange_flat = (current_size == 0)
             
-            if current_size == 0:
-                # 只有在没有开仓时才设置保证金类型
+            current_leverage = self.get_leverage()
+            if self._exchange_flat:
+                # 只有在没有开仓时才设置保证金类型和杠杆
                 margin_result = self.exchange_api.set_margin_type(symbol, 'ISOLATED')
                 if not margin_result['success']:
                     self.logger.warning(f"⚠️  设置保证金类型失败: {margin_result['error']}")
                 else:
-                    self.logger.info(f"✅ 保证金类型已设置为: ISOLATED")
-            else:
-                self.logger.info(f"💡 当前有开仓 ({current_size})，跳过保证金类型设置")
-            
-                            # 设置杠杆（只有在没有开仓时才设置）
-                if current_size == 0:
-                    current_leverage = self.get_leverage()
-                    leverage_result = self.exchange_api.set_leverage(symbol, current_leverage)
-                    if not leverage_result['success']:
-                        error_msg = leverage_result['error']
-                        if 'ip_info' in leverage_result:
-                            error_msg += f"({leverage_result['ip_info']})"
-                        
-                        # 检查是否是API权限不足的错误
-                        if 'Invalid API-key' in error_msg or 'permissions' in error_msg or '401' in error_msg:
-                            self.logger.warning(f"⚠️  API权限不足，跳过Binance杠杆倍数修改: {error_msg}")
-                            self.logger.info(f"💡 系统将使用本地配置的杠杆倍数: {current_leverage}x")
-                        else:
-                            self.logger.warning(f"杠杆设置警告: {error_msg}")
+                    self.logger.info("✅ 保证金类型已设置为: ISOLATED")
+                
+                leverage_result = self.exchange_api.set_leverage(symbol, current_leverage)
+                if not leverage_result['success']:
+                    error_msg = leverage_result['error']
+                    if 'ip_info' in leverage_result:
+                        error_msg += f"({leverage_result['ip_info']})"
+                    
+                    # 检查是否是API权限不足的错误
+                    if 'Invalid API-key' in error_msg or 'permissions' in error_msg or '401' in error_msg:
+                        self.logger.warning(f"⚠️  API权限不足，跳过Binance杠杆倍数修改: {error_msg}")
+                        self.logger.info("💡 系统将使用本地配置的杠杆倍数: %sx", current_leverage)
                     else:
-                        self.logger.info(f"✅ 杠杆倍数已设置: {current_leverage}x")
+                        self.logger.warning(f"杠杆设置警告: {error_msg}")
                 else:
-                    current_leverage = self.get_leverage()
-                    self.logger.info(f"💡 当前有开仓，跳过杠杆设置，使用当前杠杆: {current_position.get('leverage', current_leverage)}x")
+                    self.logger.info("✅ 杠杆倍数已设置: %sx", current_leverage)
+            else:
+                self.logger.info("💡 当前有开仓，跳过保证金类型和杠杆设置，使用当前杠杆: %sx", current_leverage)
             
             # 执行订单
             result = self.exchange_api.place_order(symbol, order_side, eth_amount)
             
             if result['success']:
+                self._exchange_flat = False
+                
                 # 设置持仓状态
                 position_value = 1 if trade_direction == 'long' else -1
                 entry_price = current_price
@@ -619,10 +902,9 @@ class TradingSystem:
                 
                 # 设置策略的持仓数量和杠杆
                 if hasattr(self, 'strategy'):
-                    if hasattr(self.strategy, 'set_position_quantity'):
-                        self.strategy.set_position_quantity(eth_amount)
+                    if self._set_pos_qty is not None:
+                        self._set_pos_qty(eth_amount)
                     if hasattr(self.strategy, 'set_leverage'):
-                        current_leverage = self.get_leverage()
                         self.strategy.set_leverage(current_leverage)
                 
                 # 更新资金和记录交易 - 期货交易只扣除保证金
@@ -632,8 +914,6 @@ class TradingSystem:
                 
                 # 记录交易 - 记录实际持仓价值（包含杠杆效果）
                 quantity_sign = 1 if trade_direction == 'long' else -1
-                # 从策略获取当前杠杆倍数（确保同步）
-                current_leverage = self.get_leverage()
                 actual_position_value = usdt_amount * current_leverage  # 实际持仓价值
                 self.record_trade(trade_type, actual_position_value, signal_score, 
                                 f"{trade_direction}信号触发 (评分:{signal_score:.3f})", 
@@ -642,7 +922,8 @@ class TradingSystem:
                 # 发送通知
                 self._send_trade_notification('open', trade_direction, current_price, eth_amount, signal_score)
                 
-                self.logger.info(f"🟢 开{trade_direction}仓成功 - 订单ID: {result['order_id']}, ETH数量: {eth_amount:.4f}, 保证金: {margin_used:.2f} USDT (杠杆: {current_leverage}x)")
+                self.logger.info("🟢 开%s仓成功 - 订单ID: %s, ETH数量: %.4f, 保证金: %.2f USDT (杠杆: %sx)",
+                                 trade_direction, result['order_id'], eth_amount, margin_used, current_leverage)
                 return True
             else:
                 self.logger.error(f"开{trade_direction}仓失败: {result['error']}")
@@ -662,8 +943,8 @@ class TradingSystem:
             self.set_position(position_value, current_price, current_price)
             
             # 设置策略的持仓数量
-            if hasattr(self, 'strategy') and hasattr(self.strategy, 'set_position_quantity'):
-                self.strategy.set_position_quantity(eth_amount)
+            if self._set_pos_qty is not None:
+                self._set_pos_qty(eth_amount)
             
             # 更新资金和记录交易 - 期货交易只扣除保证金
             margin_used = usdt_amount  # 保证金就是策略计算的仓位大小
@@ -688,35 +969,49 @@ class TradingSystem:
             self.logger.error(f"执行模拟交易失败: {e}")
             return False
     
-    def _send_trade_notification(self, action, direction, price, quantity, signal_score, is_simulated=False):
-        """发送交易通知"""
+    def setup_notifications(self):
+        """初始化通知状态；Telegram通知由通知器自己的队列和后台线程发送，交易线程只负责入队"""
+        # 上次发送的信号通知，信号不变时不重复发送
+        self._last_notified_signal = None
+        self._last_notified_score = 0.0
+        self._last_notify_ns = 0
+    
+    def _notify(self, notify_func, *args):
+        """调用notify_*放入通知器的发送队列，异常只记录不抛出"""
         try:
-            prefix = "模拟" if is_simulated else ""
-            reason = f"{prefix}{direction}信号 (评分:{signal_score:.3f})"
-            notify_trade(action, direction, price, quantity, None, reason)
+            notify_func(*args)
         except Exception as e:
             self.logger.warning(f"Telegram通知发送失败: {e}")
     
+    def _send_trade_notification(self, action, direction, price, quantity, signal_score, is_simulated=False):
+        """发送交易通知"""
+        prefix = "模拟" if is_simulated else ""
+        reason = f"{prefix}{direction}信号 (评分:{signal_score:.3f})"
+        self._notify(notify_trade, action, direction, price, quantity, None, reason)
+    
     def _send_error_notification(self, error_msg, context):
         """发送错误通知"""
-        try:
-            notify_error(error_msg, context)
-        except Exception as e:
-            self.logger.warning(f"Telegram错误通知发送失败: {e}")
+        self._notify(notify_error, error_msg, context)
     
     def save_trading_status(self):
-        """保存交易系统状态到JSON文件"""
+        """请求保存交易系统状态，0.5秒内的多次请求合并为一次写入"""
+        with self._flush_lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(0.5, self.flush_trading_status)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        return True
+    
+    def flush_trading_status(self):
+        """立即将交易系统状态写入JSON文件"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
         try:
-            from pathlib import Path
-            from datetime import datetime
-            
-            # 确保json目录存在
-            json_dir = Path('json')
-            json_dir.mkdir(exist_ok=True)
-            
-            # 准备状态数据
+            # 准备状态数据（datetime对象由序列化器直接处理，时间戳同一秒内复用同一字符串）
             status_data = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': status_timestamp(),
                 'current_position': self.current_position,
                 'position_entry_price': self.position_entry_price,
                 'current_capital': getattr(self, 'current_capital', 0),
@@ -730,17 +1025,12 @@ class TradingSystem:
                 'real_trading': getattr(self, 'real_trading', False)
             }
             
-            # 转换datetime对象为字符串
-            if status_data['last_trade_time'] and hasattr(status_data['last_trade_time'], 'isoformat'):
-                status_data['last_trade_time'] = status_data['last_trade_time'].isoformat()
-            
-            # 保存到文件
-            trading_file = json_dir / 'trading_status.json'
-            with open(trading_file, 'w', encoding='utf-8') as f:
-                json.dump(status_data, f, indent=2, ensure_ascii=False)
+            # 原子写入文件，避免Web界面读到写了一半的内容
+            trading_file = ensure_json_dir() / 'trading_status.json'
+            write_json_file(trading_file, status_data)
             
             if self.logger:
-                self.logger.debug(f"交易状态已保存: {trading_file}")
+                self.logger.debug("交易状态已保存: %s", trading_file)
             
             return True
         except Exception as e:
@@ -753,33 +1043,24 @@ class TradingSystem:
         try:
             self.trade_count += 1
             self.daily_trades += 1
-            self.last_trade_time = datetime.now()
+            self.last_trade_time = self._now()
             
             # 如果没有传入保证金和杠杆，使用系统默认值
-            current_leverage = self.get_leverage()
-            if margin is None:
-                margin = amount / current_leverage if current_leverage > 0 else amount
             if leverage is None:
-                leverage = current_leverage
-            
-            trade_record = {
-            'timestamp': self.last_trade_time,
-            'type': trade_type,
-            'amount': amount,
-            'reason': reason,
-            'price': price,
-            'quantity': quantity,
-            'signal_score': signal_score,
-            'pnl': pnl,
-            'position': self.current_position,
-            'capital': self.current_capital,
-            'available_capital': self.available_capital,
-            'margin': margin,
-            'leverage': leverage
-            }
+                leverage = self.get_leverage()
+            if margin is None:
+                margin = amount / leverage if leverage > 0 else amount
+            
+            trade_record = _pack_trade(
+                self.last_trade_time, trade_type, amount, reason, price, quantity, signal_score,
+                pnl, self.current_position, self.current_capital, self.available_capital,
+                margin, leverage
+            )
 
-            self.trade_history.append(trade_record)
-            self.save_trade_history()
+            with self._history_lock:
+                self.trade_history.append(trade_record)
+                _count_trade(self._trade_stats, trade_record)
+            self._write_q.put(trade_record)
             self.logger.info(f"📝 交易记录: {trade_type} - 金额: {amount:,.0f} USDT, 保证金: {margin:,.2f} USDT, 杠杆: {leverage}x, 评分: {signal_score:.4f}, 理由: {reason}")
 
         except Exception as e:
@@ -787,24 +1068,150 @@ class TradingSystem:
 
     def load_trade_history(self):   
         """从文件加载交易历史"""
+        self._history_lock = threading.Lock()
+        self._trade_stats = _new_trade_stats()
         try:
             success, message, history_data = load_trade_history()   # 从文件加载交易历史    
             
             if success:
-                self.trade_history = history_data
+                # 统计值按完整历史累计，内存中只保留最近的记录，更早的记录仍在磁盘上
+                for trade in history_data:
+                    _count_trade(self._trade_stats, trade)
+                self.trade_history = collections.deque(history_data[-TRADE_HISTORY_MAXLEN:],
+                                                       maxlen=TRADE_HISTORY_MAXLEN)
                 self.logger.info(f"✅ {message}")
             else:
                 self.logger.error(f"❌ {message}")
-                self.trade_history = []
+                self.trade_history = collections.deque(maxlen=TRADE_HISTORY_MAXLEN)
                 
         except Exception as e:
             self.logger.error(f"❌ 加载交易历史失败: {e}")
-            self.trade_history = []
+            self.trade_history = collections.deque(maxlen=TRADE_HISTORY_MAXLEN)
+    
+    def get_trade_history_snapshot(self):
+        """返回内存中最近交易记录的列表副本，供其他线程安全遍历"""
+        with self._history_lock:
+            return list(self.trade_history)
+    
+    def get_trade_stats(self):
+        """返回按完整交易历史累计的统计值（不受内存中记录条数上限影响）"""
+        with self._history_lock:
+            return dict(self._trade_stats)
 
+    def _start_writer(self):
+        """启动后台写盘线程（已在运行时忽略）"""
+        if self._writer_thread is not None and self._writer_thread.is_alive():
+            return
+        self._writer_thread = threading.Thread(target=self._writer_loop, name='trade-writer', daemon=True)
+        self._writer_thread.start()
+    
+    def _stop_writer(self, timeout=10):
+        """发送结束标记并等待写盘线程把队列中的记录全部落盘"""
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            return
+        self._write_q.put(None)
+        self._writer_thread.join(timeout=timeout)
+        if self._writer_thread.is_alive():
+            self.logger.warning("⚠️ 写盘线程未在超时时间内结束")
+            return
+        
+        # 结束标记之后才入队的记录（如交易线程超时未结束时）在当前线程写入
+        drained = 0
+        while True:
+            try:
+                trade_record = self._write_q.get_nowait()
+            except queue.Empty:
+                break
+            if trade_record is not None:
+                try:
+                    append_trade_record(self._trades_log, trade_record)
+                    self._journaled_count += 1
+                    drained += 1
+                except Exception as e:
+                    self.logger.error(f"❌ 写入交易记录日志失败: {e}")
+            self._write_q.task_done()
+        if drained:
+            self._flush_trade_history(force=True)
+    
+    def _writer_loop(self):
+        """后台写盘线程：批量取出交易记录追加到日志，空闲时按阈值flush并定期做快照"""
+        write_q = self._write_q
+        while True:
+            try:
+                batch = [write_q.get(timeout=self._flush_interval)]
+            except queue.Empty:
+                self._flush_trade_history()
+                self._maybe_checkpoint()
+                continue
+            
+            while True:
+                try:
+                    batch.append(write_q.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stopping = False
+            for trade_record in batch:
+                if trade_record is None:
+                    stopping = True
+                    continue
+                try:
+                    append_trade_record(self._trades_log, trade_record)
+                    self._journaled_count += 1
+                    self._trades_dirty = True
+                    self._trades_pending += 1
+                except Exception as e:
+                    self.logger.error(f"❌ 写入交易记录日志失败: {e}")
+            
+            if stopping:
+                self._flush_trade_history(force=True)
+            else:
+                self._maybe_flush()
+                self._maybe_checkpoint()
+            for _ in batch:
+                write_q.task_done()
+            if stopping:
+                return
+    
+    def _maybe_flush(self):
+        """交易记录日志达到时间或条数阈值时才推送到操作系统"""
+        if not self._trades_dirty:
+            return
+        if (_now_ns() - self._last_flush_ns >= self._flush_interval * _NS_PER_SEC
+                or self._trades_pending >= self._flush_threshold):
+            self._flush_trade_history()
+    
+    def _flush_trade_history(self, force=False):
+        """推送交易记录日志缓冲区，force=True时忽略脏标记"""
+        if not (force or self._trades_dirty):
+            return
+        try:
+            self._trades_log.flush()
+            self._trades_dirty = False
+            self._trades_pending = 0
+            self._last_flush_ns = _now_ns()
+        except Exception as e:
+            self.logger.error(f"❌ 写入交易记录日志失败: {e}")
+    
+    def _maybe_checkpoint(self):
+        """距上次快照超过检查点间隔（或追加日志过长）且有新交易时，重写快照并清空追加日志"""
+        journaled_count = self._journaled_count
+        if (journaled_count - self._checkpoint_count < self._checkpoint_max_lines
+                and _now_ns() - self._last_checkpoint_ns < self._checkpoint_interval * _NS_PER_SEC):
+            return
+        if journaled_count != self._checkpoint_count:
+            self.save_trade_history()
+            self._checkpoint_count = journaled_count
+        self._last_checkpoint_ns = _now_ns()
+    
     def save_trade_history(self):
-        """保存交易历史到文件"""
+        """保存交易历史到文件：把已落盘的交易记录日志合并进快照"""
         try:
-            success, message = save_trade_history(self.trade_history)
+            self._flush_trade_history(force=True)
+            success, message = compact_trade_history()
+            # 压缩时追加日志已改名合并，之后的记录写入新的日志文件
+            self._trades_log.close()
+            self._trades_log = open_trades_log()
             if success:
                 self.logger.info(f"✅ {message}")
             else:
@@ -816,51 +1223,42 @@ class TradingSystem:
     def _close_position_common(self, close_type, reason, market_data, signal_score=0):
         """通用平仓逻辑"""
         try:
-            position_desc = "多头" if self.current_position == 1 else "空头"
-            current_price = market_data['close'].iloc[-1] if not market_data.empty else 0
+            position = self.current_position
+            current_leverage = self.get_leverage()
+            position_desc = _POSITION_DESC.get(position, '未知')
+            current_price = float(market_data['close'].values[-1]) if not market_data.empty else 0
             
             # 获取当前持仓信息用于通知
-            current_position_side = 'long' if self.current_position == 1 else 'short'
+            current_position_side = _POSITION_SIDE.get(position, 'short')
             # 从策略获取持仓数量
             current_position_quantity = 0.0
             if hasattr(self, 'strategy') and hasattr(self.strategy, 'position_quantity'):
                 current_position_quantity = getattr(self.strategy, 'position_quantity', 0.0)
             
             # 添加调试日志
-            self.logger.info(f"🔍 平仓数据 - 系统记录: 数量={current_position_quantity:.4f} ETH, 开仓价={self.position_entry_price:.2f}, 当前价={current_price:.2f}")
+            self.logger.debug("🔍 平仓数据 - 系统记录: 数量=%.4f ETH, 开仓价=%.2f, 当前价=%.2f",
+                             current_position_quantity, self.position_entry_price, current_price)
             
             # 计算已实现盈亏
             realized_pnl = 0
-            if self.current_position != 0:  # 只要有持仓就计算盈亏
+            if position != 0:  # 只要有持仓就计算盈亏
                 # 使用策略的盈亏计算方法，传入杠杆参数
-                if hasattr(self, 'strategy') and hasattr(self.strategy, 'calculate_unrealized_pnl'):
-                    # 从策略获取当前杠杆倍数（确保同步）
-                    current_leverage = self.get_leverage()
-                    pnl_result = self.strategy.calculate_unrealized_pnl(current_price, current_leverage)
+                if self._calc_pnl is not None:
+                    pnl_result = self._calc_pnl(current_price, current_leverage)
                     realized_pnl = pnl_result['pnl']
                 else:
                     # 回退到简单计算
-                    if self.current_position == 1:  # 多头
+                    if position == 1:  # 多头
                         realized_pnl = (current_price - self.position_entry_price) * 0.1
-                    elif self.current_position == -1:  # 空头
+                    elif position == -1:  # 空头
                         realized_pnl = (self.position_entry_price - current_price) * 0.1
-                
-                # 构建持仓信息用于日志记录
-                position_info = {
-                    'position_desc': position_desc,
-                    'position_type': current_position_side,
-                    'entry_price': self.position_entry_price,
-                    'close_price': current_price,
-                    'quantity': current_position_quantity
-                }
-                
-               
+            
             # 设置策略持仓状态为无持仓
             self.set_position(0, 0, current_price)
             
             # 清零策略的持仓数量
-            if hasattr(self, 'strategy') and hasattr(self.strategy, 'set_position_quantity'):
-                self.strategy.set_position_quantity(0.0)
+            if self._set_pos_qty is not None:
+                self._set_pos_qty(0.0)
         
             self.available_capital = self.current_capital
             
@@ -874,52 +1272,39 @@ class TradingSystem:
             
             # 记录交易 - 传递正确的交易金额和信号评分
             # 计算保证金（从持仓价值反推）
-            # 从策略获取当前杠杆倍数（确保同步）
-            current_leverage = self.get_leverage()
             margin_used = trade_amount / current_leverage if current_leverage > 0 else trade_amount
             self.record_trade(close_type, trade_amount, current_signal_score, reason, current_price, current_position_quantity, realized_pnl, margin_used, current_leverage)
             
             if self.real_trading and self.exchange_api:
                 # 真实平仓
-                symbol = TRADING_CONFIG.get('SYMBOL', 'ETHUSDT')
-                result = self.exchange_api.close_position(symbol)
+                result = self.exchange_api.close_position(self._symbol)
                 
                 if result['success']:
-                    self.logger.info(f"⚪ 真实{close_type}成功 ({position_desc}) - {reason}")
-                    
-                    # 发送Telegram通知
-                    try:
-                        close_reason = f"真实{close_type} ({reason}) - {position_desc}"
-                        # 使用系统内部记录的持仓数量，而不是交易所返回的数量
-                        notify_trade('close', current_position_side, 
-                                   current_price, abs(current_position_quantity), realized_pnl, close_reason)
-                    except Exception as e:
-                        self.logger.warning(f"Telegram通知发送失败: {e}")
+                    self._exchange_flat = True
+                    mode_label = "真实"
+                    self.logger.info("⚪ 真实%s成功 (%s) - %s", close_type, position_desc, reason)
                 else:
+                    mode_label = None
                     self.logger.error(f"真实{close_type}失败: {result['error']}")
                     # 发送错误通知
-                    try:
-                        notify_error(f"{close_type}失败: {result['error']}", "真实交易执行")
-                    except Exception as e:
-                        self.logger.warning(f"Telegram错误通知发送失败: {e}")
+                    self._send_error_notification(f"{close_type}失败: {result['error']}", "真实交易执行")
             else:
                 # 模拟平仓
-                self.logger.info(f"⚪ 模拟{close_type} ({position_desc}) - {reason}")
-                
-                # 发送Telegram通知
-                try:
-                    close_reason = f"模拟{close_type} ({reason}) - {position_desc}"
-                    notify_trade('close', current_position_side, 
-                               current_price, abs(current_position_quantity), realized_pnl, close_reason)
-                except Exception as e:
-                    self.logger.warning(f"Telegram通知发送失败: {e}")
+                mode_label = "模拟"
+                self.logger.info("⚪ 模拟%s (%s) - %s", close_type, position_desc, reason)
+            
+            # 平仓成功时发送Telegram通知，使用系统内部记录的持仓数量，而不是交易所返回的数量
+            if mode_label is not None:
+                self._notify(notify_trade, 'close', current_position_side,
+                             current_price, abs(current_position_quantity), realized_pnl,
+                             "%s%s (%s) - %s" % (mode_label, close_type, reason, position_desc))
             
         except Exception as e:
             self.logger.error(f"执行{close_type}失败: {e}")
     
     def execute_risk_management_close(self, risk_action, risk_reason, market_data):
         """执行风险管理平仓（止损/止盈）"""
-        position_desc = "多头" if self.current_position == 1 else "空头"
+        position_desc = _POSITION_DESC.get(self.current_position, '未知')
         reason = f"{risk_action} ({risk_reason}) - {position_desc}"
         
         # 获取当前信号评分
@@ -935,84 +1320,88 @@ class TradingSystem:
         
         while self.running:
             try:
+                # 本次循环内统一使用同一个时间
+                current_time = self._begin_tick()
+                
                 # 获取市场数据
                 market_data = self.get_market_data()
                 if market_data is None:
-                    # 使用更短的睡眠间隔，定期检查停止标志
-                    for _ in range(30):  # 30秒，每秒检查一次
-                        if not self.running:
-                            break
-                        time.sleep(2)
+                    self._end_tick()
+                    # 等待后重试，stop()时立即唤醒
+                    self._stop_event.wait(timeout=60)
                     continue
                 
-                # 获取当前价格和时间
-                current_price = market_data['close'].iloc[-1] if not market_data.empty else 0
-                current_time = datetime.now()
+                # 获取当前价格和最新一行数据（get_market_data已提取）
+                current_price = self._last_price
                 
                 # 创建增强的行数据
-                current_row = market_data.iloc[-1]
-                enhanced_row = {'row_data': current_row.to_dict(), 'multi_timeframe_data': None}
+                enhanced_row = {'row_data': self._last_row_dict, 'multi_timeframe_data': None}
                 
                 # 标记是否在当前时间点执行了平仓
                 position_closed_this_time = False
                 
                 # ===== 策略持仓状态管理（策略现在是权威数据源） =====
                 # 更新策略的持仓信息（每次循环都执行）
-                if hasattr(self.strategy, 'update_position_info'):
+                if self._update_pos_info is not None:
                     margin_used = self.get_margin_used()
-                    self.strategy.update_position_info(self.current_position, self.position_entry_price, current_price, current_time, 0.0, margin_value=margin_used)
+                    self._update_pos_info(self.current_position, self.position_entry_price, current_price, current_time, 0.0, margin_value=margin_used)
                 
                 # ===== 持仓状态下的风险管理检查（优先级最高） =====
-                if self.current_position != 0 and hasattr(self.strategy, 'check_risk_management'):
+                if self.current_position != 0 and self._check_risk is not None:
                     try:
                         # 执行策略的风险管理检查
-                        risk_action, risk_reason = self.strategy.check_risk_management(
+                        risk_action, risk_reason = self._check_risk(
                             current_price, enhanced_row, current_time
                         )
                         
-                        self.logger.info(f"🔍 风险管理结果 - 动作: {risk_action}, 原因: {risk_reason}")
+                        self.logger.debug("🔍 风险管理结果 - 动作: %s, 原因: %s", risk_action, risk_reason)
                         
                         if risk_action == 'stop_loss':
-                            self.logger.info(f"🚨 策略触发止损 - 原因: {risk_reason}")
+                            self.logger.info("🚨 策略触发止损 - 原因: %s", risk_reason)
                             self.execute_risk_management_close(risk_action, risk_reason, market_data)
                             position_closed_this_time = True
 
                         elif risk_action == 'take_profit':
-                            self.logger.info(f"🟢 策略触发止盈 - 原因: {risk_reason}")
+                            self.logger.info("🟢 策略触发止盈 - 原因: %s", risk_reason)
                             self.execute_risk_management_close(risk_action, risk_reason, market_data)
                             position_closed_this_time = True
                             
                         elif risk_action == 'hold':
                             # 继续持仓，但继续执行信号检测
-                            self.logger.debug(f"📊 持仓状态 - 继续执行信号检测")
+                            self.logger.debug("📊 持仓状态 - 继续执行信号检测")
                     except Exception as e:
                         self.logger.error(f"策略风险管理检查异常: {e}")
                         # 策略风险管理检查失败时，记录错误但不进行兜底处理
                         # 兜底止损逻辑已移至策略内部统一管理
                 elif self.current_position == 0:
                     # 无持仓状态，记录调试信息
-                    self.logger.debug(f"📊 无持仓状态 - 跳过风险管理检查，直接执行信号检测")
+                    self.logger.debug("📊 无持仓状态 - 跳过风险管理检查，直接执行信号检测")
                 
                 # ===== 检查冷却处理（记录但不跳过信号检测） =====
                 cooldown_active = False
-                if hasattr(self.strategy, 'cooldown_manager') and hasattr(self.strategy.cooldown_manager, 'should_skip_trade'):
-                    cooldown_active = self.strategy.cooldown_manager.should_skip_trade(self.strategy.enable_cooldown_treatment)
-                    if cooldown_active:
-                        self.logger.info(f"⏸️ 冷却处理中 - 继续检测信号但不执行交易")
+                if self._cooldown_should_skip is not None:
+                    cooldown_active = self._cooldown_should_skip(self.strategy.enable_cooldown_treatment)
+                    if cooldown_active and self._log_every_n('cooldown', 12):
+                        self.logger.info("⏸️ 冷却处理中 - 继续检测信号但不执行交易")
                         # 记录冷却处理状态信息
                         if hasattr(self.strategy.cooldown_manager, 'get_status'):
                             status = self.strategy.cooldown_manager.get_status()
-                            self.logger.info(f"冷却处理状态 - 级别: {status.get('cooldown_treatment_level', 0)}, "
-                                          f"已跳过: {status.get('skipped_trades_count', 0)}/{status.get('max_skip_trades', 0)}")
+                            self.logger.info("冷却处理状态 - 级别: %s, 已跳过: %s/%s",
+                                             status.get('cooldown_treatment_level', 0),
+                                             status.get('skipped_trades_count', 0),
+                                             status.get('max_skip_trades', 0))
                 
                 # ===== 获取交易信号 =====
                 try:
                     signal_info = self.strategy.generate_signals(market_data, verbose=False)
                     signal = signal_info.get('signal', 0)  # 从字典中提取信号值
                     
-                    # 发送信号通知（每次生成信号都发送）
-                    try:
-                        signal_score = signal_info.get('signal_score', 0.0)
+                    # 发送信号通知：信号方向或评分明显变化，或距上次发送超过15分钟时才入队
+                    signal_score = signal_info.get('signal_score', 0.0)
+                    tick_ns = self._tick_ns
+                    if (signal != self._last_notified_signal
+                            or abs(signal_score - self._last_notified_score) > 0.05
+                            or tick_ns - self._last_notify_ns > 900 * _NS_PER_SEC):
                         signal_reason = signal_info.get('reason', '')
                         investment_advice = signal_info.get('investment_advice', '')
                         
@@ -1020,66 +1409,67 @@ class TradingSystem:
                         signal_from = signal_info.get('signal_from', 'unknown')
                         
                         # 发送Telegram信号通知
-                        notify_signal(signal, current_price, signal_score, signal_reason, investment_advice, signal_from)
-                    except Exception as e:
-                        self.logger.warning(f"Telegram信号通知发送失败: {e}")
+                        self._notify(notify_signal, signal, current_price, signal_score,
+                                     signal_reason, investment_advice, signal_from)
+                        self._last_notified_signal = signal
+                        self._last_notified_score = signal_score
+                        self._last_notify_ns = tick_ns
                     
                     # 处理交易信号 - 持仓状态下继续检测信号但不开仓
                     if signal != 0:
                         # 添加调试信息
-                        self.logger.debug(f"[{current_time}] 检测到信号 - signal: {signal}, position: {self.current_position}, position_closed_this_time: {position_closed_this_time}")
+                        self.logger.debug("[%s] 检测到信号 - signal: %s, position: %s, position_closed_this_time: %s",
+                                          current_time, signal, self.current_position, position_closed_this_time)
                         
                         # 记录交易信号到日志
-                        signal_type = "多头" if signal == 1 else "空头"
+                        signal_type = _POSITION_DESC.get(signal, '未知')
                         position_status = "持仓中" if self.current_position != 0 else "无持仓"
-                        self.logger.info(f"信号: {signal_type} | 价格: {current_price:.2f} | 状态: {position_status}")
+                        self.logger.info("信号: %s | 价格: %.2f | 状态: %s", signal_type, current_price, position_status)
                         
                         # 检查是否在冷却期间
                         if cooldown_active:
                             # 冷却期间记录信号但不执行交易
                             signal_score = signal_info.get('signal_score', 0.0)
-                            self.logger.info(f"⏸️ 冷却期间检测到{signal_type}信号 (评分: {signal_score:.3f}) - 跳过交易执行")
+                            self.logger.info("⏸️ 冷却期间检测到%s信号 (评分: %.3f) - 跳过交易执行", signal_type, signal_score)
                         # 只在无持仓状态下执行开仓
                         elif self.current_position == 0 and not position_closed_this_time:
                             # 使用策略的开仓检查方法
-                            if hasattr(self.strategy, 'should_open_position'):
-                                should_open = self.strategy.should_open_position(signal, enhanced_row, current_time)
+                            if self._should_open is not None:
+                                should_open = self._should_open(signal, enhanced_row, current_time)
                                 if should_open is False:
-                                    self.logger.info(f"📊 策略拒绝开仓 - 信号: {signal_type}, 评分: {signal_score:.3f}")
+                                    self.logger.info("📊 策略拒绝开仓 - 信号: %s, 评分: %.3f", signal_type, signal_score)
                                     # 不执行continue，继续执行后续逻辑
                                 else:
                                     # 执行开仓
                                     self.execute_trade(signal_info, market_data)
                                     
                                     # 更新策略的持仓信息
-                                    if hasattr(self.strategy, 'update_position_info'):
+                                    if self._update_pos_info is not None:
                                         # 获取信号评分
                                         signal_score = signal_info.get('signal_score', 0.0)
                                         margin_used = self.get_margin_used()
-                                        self.strategy.update_position_info(self.current_position, self.position_entry_price, current_price, current_time, signal_score, margin_value=margin_used)
+                                        self._update_pos_info(self.current_position, self.position_entry_price, current_price, current_time, signal_score, margin_value=margin_used)
                         else:
                             # 持仓状态下记录信号但不执行交易
-                            signal_score = signal_info.get('signal_score', 0.0)
-                            self.logger.info(f"📊 持仓状态下检测到{signal_type}信号 (评分: {signal_score:.3f}) - 继续监控")
+                            if self._log_every_n('holding_signal', 12):
+                                signal_score = signal_info.get('signal_score', 0.0)
+                                self.logger.info("📊 持仓状态下检测到%s信号 (评分: %.3f) - 继续监控", signal_type, signal_score)
                     
                 except Exception as e:
                     self.logger.error(f"获取信号异常: {e}")
                 
-                # 等待下次循环 - 使用更短的睡眠间隔，定期检查停止标志
-                signal_check_interval = TRADING_CONFIG.get('SIGNAL_CHECK_INTERVAL', 300)
-                for _ in range(signal_check_interval):  # 每秒检查一次停止标志
-                    if not self.running:
-                        self.logger.info("🛑 检测到停止信号，退出交易循环")
-                        break
-                    time.sleep(1)
+                self._end_tick()
+                
+                # 等待下次循环，stop()时立即唤醒
+                if self._stop_event.wait(timeout=self.signal_check_interval):
+                    self.logger.info("🛑 检测到停止信号，退出交易循环")
+                    break
                 
             except Exception as e:
+                self._end_tick()
                 self.logger.error(f"交易循环异常: {e}")
-                # 异常情况下也使用更短的睡眠间隔
-                for _ in range(30):
-                    if not self.running:
-                        break
-                    time.sleep(1)
+                # 异常情况下等待后重试，stop()时立即唤醒
+                self._stop_event.wait(timeout=30)
     
     def get_position_info(self):
         """获取持仓信息 - 为Web界面提供数据"""
@@ -1105,23 +1495,21 @@ class TradingSystem:
                 }
             
             # 有持仓时，获取持仓信息
-            position_desc = {1: '多头', -1: '空头', 0: '无仓位'}.get(self.current_position, '未知')
+            position_desc = _POSITION_DESC.get(self.current_position, '未知')
             
             # 获取当前价格
-            current_price = None
-            if hasattr(self, '_cached_market_data') and self._cached_market_data is not None:
-                current_price = self._cached_market_data['close'].iloc[-1]
-            else:
+            current_price = self._last_price
+            if current_price is None:
                 market_data = self.get_market_data()
                 if market_data is not None and not market_data.empty:
-                    current_price = market_data['close'].iloc[-1]
+                    current_price = float(market_data['close'].values[-1])
             
             # 计算未实现盈亏
             unrealized_pnl = 0.0
             unrealized_pnl_percent = 0.0
-            if hasattr(self, 'strategy') and hasattr(self.strategy, 'calculate_unrealized_pnl'):
+            if self._calc_pnl is not None:
                 try:
-                    pnl_result = self.strategy.calculate_unrealized_pnl(current_price)
+                    pnl_result = self._calc_pnl(current_price)
                     unrealized_pnl = pnl_result.get('pnl', 0.0)
                     unrealized_pnl_percent = pnl_result.get('percentage', 0.0)
                 except Exception as e:
@@ -1133,7 +1521,7 @@ class TradingSystem:
             return {
                 'position_desc': position_desc,
                 'position_direction': self.current_position,
-                'position_type': 'long' if self.current_position == 1 else 'short',
+                'position_type': _POSITION_SIDE.get(self.current_position, 'short'),
                 'entry_price': self.position_entry_price,
                 'quantity': position_quantity,
                 'value': position_value,
@@ -1164,13 +1552,11 @@ class TradingSystem:
         """获取当前盈亏信息 - 为Web界面提供数据"""
         try:
             # 获取当前价格
-            current_price = None
-            if hasattr(self, '_cached_market_data') and self._cached_market_data is not None:
-                current_price = self._cached_market_data['close'].iloc[-1]
-            else:
+            current_price = self._last_price
+            if current_price is None:
                 market_data = self.get_market_data()
                 if market_data is not None and not market_data.empty:
-                    current_price = market_data['close'].iloc[-1]
+                    current_price = float(market_data['close'].values[-1])
             
             # 检查是否有实际持仓
             position_quantity = 0.0
@@ -1179,18 +1565,18 @@ class TradingSystem:
             
             # 计算未实现盈亏
             unrealized_pnl = 0.0
-            if position_quantity > 0.0 and hasattr(self, 'strategy') and hasattr(self.strategy, 'calculate_unrealized_pnl'):
+            if position_quantity > 0.0 and self._calc_pnl is not None:
                 try:
                     # 传入杠杆参数，确保盈亏计算考虑杠杆倍数
                     # 从策略获取当前杠杆倍数（确保同步）
                     current_leverage = self.get_leverage()
-                    pnl_result = self.strategy.calculate_unrealized_pnl(current_price, current_leverage)
+                    pnl_result = self._calc_pnl(current_price, current_leverage)
                     unrealized_pnl = pnl_result.get('pnl', 0.0)
                     
                     # 记录杠杆效果（用于调试）
                     leverage_effect = pnl_result.get('leverage_effect', '')
                     if leverage_effect:
-                        self.logger.debug(f"杠杆盈亏计算: {leverage_effect}")
+                        self.logger.debug("杠杆盈亏计算: %s", leverage_effect)
                         
                 except Exception as e:
                     self.logger.warning(f"计算未实现盈亏失败: {e}")
@@ -1206,7 +1592,7 @@ class TradingSystem:
                 'current_capital': self.current_capital,
                 'available_capital': self.available_capital,
                 'position_direction': self.current_position,
-                'position_desc': {1: '多头', -1: '空头', 0: '无仓位'}.get(self.current_position, '未知')
+                'position_desc': _POSITION_DESC.get(self.current_position, '未知')
             }
             
         except Exception as e:
@@ -1229,20 +1615,19 @@ class TradingSystem:
             return False, "系统已在运行中"
         
         try:
+            self._stop_event.clear()
             self.running = True
             self.logger.info("🚀 启动交易系统")
             
             # 发送系统启动通知
-            try:
-                notify_status('start', '交易系统启动', 
-                             f'ETHUSDT交易系统已成功启动\n'
-                             f'运行模式: {self.mode}\n'
-                             f'初始资金: {self.initial_capital:,.0f} USDT\n'
-                             f'正在监控市场信号...')
-            except Exception as e:
-                self.logger.warning(f"Telegram启动通知发送失败: {e}")
-            
-            # 启动交易线程
+            self._notify(notify_status, 'start', '交易系统启动',
+                         f'ETHUSDT交易系统已成功启动\n'
+                         f'运行模式: {self.mode}\n'
+                         f'初始资金: {self.initial_capital:,.0f} USDT\n'
+                         f'正在监控市场信号...')
+            
+            # 启动写盘线程和交易线程
+            self._start_writer()
             self.trading_thread = threading.Thread(target=self.trading_loop, daemon=True)
             self.trading_thread.start()
             
@@ -1268,8 +1653,22 @@ class TradingSystem:
         
         self.logger.info("🛑 正在停止交易系统...")
         
-        # 设置停止标志
+        # 设置停止标志，唤醒等待中的循环
         self.running = False
+        self._stop_event.set()
+        
+        # 先等待交易线程结束，确保本轮tick中记录的交易都已进入写盘队列后再停止写盘线程
+        try:
+            if (hasattr(self, 'trading_thread') and self.trading_thread and self.trading_thread.is_alive()
+                    and self.trading_thread is not threading.current_thread()):
+                self.logger.info("⏳ 等待交易线程结束...")
+                self.trading_thread.join(timeout=15)  # 增加超时时间到15秒
+                if self.trading_thread.is_alive():
+                    self.logger.warning("⚠️ 交易线程未在超时时间内结束，但系统将继续停止")
+                else:
+                    self.logger.info("✅ 交易线程已结束")
+        except Exception as e:
+            self.logger.error(f"❌ 等待交易线程时出错: {e}")
         
         # 保存系统状态
         try:
@@ -1283,22 +1682,19 @@ class TradingSystem:
         
         try:
             self.logger.info("💾 正在保存交易历史...")
-            self.save_trade_history()
+            if self._flush_timer is not None:
+                self.flush_trading_status()
+            self._stop_writer()
+            if self._writer_thread is not None and self._writer_thread.is_alive():
+                # 写盘线程仍可能追加日志，此时压缩会丢失改名后写入的记录，留到下次启动时合并
+                self.logger.warning("⚠️ 写盘线程仍在运行，跳过交易历史压缩")
+            else:
+                self.save_trade_history()
+                self._checkpoint_count = self._journaled_count
+                os.fsync(self._trades_log.fileno())
         except Exception as e:
             self.logger.error(f"保存交易历史失败: {e}")
         
-        # 等待交易线程结束
-        try:
-            if hasattr(self, 'trading_thread') and self.trading_thread and self.trading_thread.is_alive():
-                self.logger.info("⏳ 等待交易线程结束...")
-                self.trading_thread.join(timeout=15)  # 增加超时时间到15秒
-                if self.trading_thread.is_alive():
-                    self.logger.warning("⚠️ 交易线程未在超时时间内结束，但系统将继续停止")
-                else:
-                    self.logger.info("✅ 交易线程已结束")
-        except Exception as e:
-            self.logger.error(f"❌ 等待交易线程时出错: {e}")
-        
         # 检查并等待其他可能存在的线程
         thread_attributes = ['heartbeat_thread', 'interactive_thread', 'monitor_thread']
         for thread_name in thread_attributes:
@@ -1322,17 +1718,14 @@ class TradingSystem:
         except Exception as e:
             self.logger.warning(f"关闭数据库连接时出错: {e}")
         
-        # 发送系统停止通知
-        try:
-            uptime = datetime.now() - self.start_time
-            notify_status('stop', '交易系统停止', 
-                         f'交易系统已停止\n'
-                         f'运行时间: {str(uptime).split(".")[0]}\n'
-                         f'总交易次数: {self.trade_count}\n'
-                         f'当前资金: {self.current_capital:,.0f} USDT\n'
-                         f'总盈亏: {self.total_pnl:,.2f} USDT')
-        except Exception as e:
-            self.logger.warning(f"Telegram停止通知发送失败: {e}")
+        # 发送系统停止通知（进程退出前由通知器发送完队列中的消息）
+        uptime = datetime.now() - self.start_time
+        self._notify(notify_status, 'stop', '交易系统停止',
+                     f'交易系统已停止\n'
+                     f'运行时间: {str(uptime).split(".")[0]}\n'
+                     f'总交易次数: {self.trade_count}\n'
+                     f'当前资金: {self.current_capital:,.0f} USDT\n'
+                     f'总盈亏: {self.total_pnl:,.2f} USDT')
         
         self.logger.info("✅ 交易系统已停止")
         return True, "交易系统已成功停止"
@@ -1343,7 +1736,7 @@ class TradingSystem:
         
         # 显示当前持仓状态
         if self.current_position != 0:
-            position_desc = {1: '多头', -1: '空头'}.get(self.current_position, '未知')
+            position_desc = _POSITION_DESC.get(self.current_position, '未知')
             # 从策略获取持仓数量
             if hasattr(self, 'strategy') and hasattr(self.strategy, 'position_quantity'):
                 position_quantity = self.strategy.position_quantity
@@ -1358,8 +1751,8 @@ class TradingSystem:
             
             # 计算未实现盈亏
             try:
-                if hasattr(self, 'strategy') and hasattr(self.strategy, 'calculate_unrealized_pnl'):
-                    pnl_result = self.strategy.calculate_unrealized_pnl()
+                if self._calc_pnl is not None:
+                    pnl_result = self._calc_pnl()
                     unrealized_pnl = pnl_result['pnl']
                     print(f"  未实现盈亏: {unrealized_pnl:,.2f} USDT")
                 else:
@@ -1376,15 +1769,18 @@ class TradingSystem:
         print(f"  今日盈亏: {self.daily_pnl:,.2f} USDT")
         print()
         
-        # 导入持续监控模块
-        try:
-            from tools.continuous_monitor import SignalMonitor
-            monitor = SignalMonitor()
-            self.logger.info(" 信号监控模块初始化完成")
-        except Exception as e:
-            self.logger.error(f"信号监控模块初始化失败: {e}")
-            # 系统继续运行
-            return
+        # 导入持续监控模块（只在首次进入服务模式时创建）
+        if self._signal_monitor is None:
+            try:
+                from tools.continuous_monitor import SignalMonitor
+                self._signal_monitor = SignalMonitor()
+                self._get_current_signal = self._signal_monitor.get_current_signal
+                self.logger.info(" 信号监控模块初始化完成")
+            except Exception as e:
+                self.logger.error(f"信号监控模块初始化失败: {e}")
+                # 系统继续运行
+                return
+        get_current_signal = self._get_current_signal
         
         # 设置监控间隔（秒）
         monitor_interval = 3600  # 每1小时检查一次，与DeepSeek缓存时间协调
@@ -1400,39 +1796,33 @@ class TradingSystem:
                 
                 # 获取当前信号
                 try:
-                    signal_info, current_data = monitor.get_current_signal()
+                    signal_info, current_data = get_current_signal()
                     
                     # 修复pandas Series布尔判断问题
                     if signal_info is not None and current_data is not None:
                         # 简化信号信息记录（原 log_signal_info 和 check_and_execute_trade 逻辑已整合到 trading_loop）
                         signal = signal_info.get('signal', 0)
                         signal_score = signal_info.get('signal_score', 0)
-                        signal_desc = {1: '做多', -1: '做空', 0: '观望'}.get(signal, '未知')
+                        signal_desc = _SIGNAL_DESC.get(signal, '未知')
                         self.logger.info(f"第{iteration}次信号 - {signal_desc} (评分: {signal_score:.3f})")
                         self.last_signal = signal
                     else:
                         self.logger.warning(f"第{iteration}次检查 - 无法获取信号数据")
                 except Exception as e:
-                    self.logger.error(f"第{iteration}次信号检查失败: {e}")
-                    import traceback
-                    self.logger.error(f"异常堆栈: {traceback.format_exc()}")
+                    self.logger.error(f"第{iteration}次信号检查失败: {e}", exc_info=True)
                 
                 # 每10次检查记录一次系统状态
                 if iteration % 10 == 0:
                     pass  # 系统状态记录已移除
                 
-                # 等待下次检查，分段等待以便及时响应停止信号
-                for _ in range(monitor_interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
+                # 等待下次检查，stop()时立即唤醒并退出
+                if self._stop_event.wait(timeout=monitor_interval):
+                    break
                 
         except KeyboardInterrupt:
             self.logger.info("📡 收到中断信号，系统继续运行...")
         except Exception as e:
-            import traceback
-            self.logger.error(f"服务模式异常: {e}")
-            self.logger.error(f"异常堆栈: {traceback.format_exc()}")
+            self.logger.error(f"服务模式异常: {e}", exc_info=True)
             # 异常情况下系统继续运行
     
     def generate_signals(self, market_data=None):
@@ -1457,8 +1847,16 @@ class TradingSystem:
             if market_data is None or market_data.empty:
                 return {'signal': 0, 'reason': '无法获取市场数据'}
             
-            # 使用策略生成信号
-            signal_info = self.strategy.generate_signals(market_data, verbose=False)
+            # 同一份K线数据（持有引用，id不会被复用）且持仓未变时复用上次的信号
+            key = (len(market_data), market_data.index[-1], self.current_position)
+            if market_data is self._last_sig_data and key == self._last_sig_key:
+                signal_info = dict(self._last_sig)
+            else:
+                # 使用策略生成信号
+                signal_info = self.strategy.generate_signals(market_data, verbose=False)
+                self._last_sig_data = market_data
+                self._last_sig_key = key
+                self._last_sig = dict(signal_info)
             
             # 添加持仓状态信息
             signal_info['current_position'] = self.current_position
@@ -1490,8 +1888,9 @@ class TradingSystem:
             return 0.0
 
 
-def main():
-    """主函数"""
+@lru_cache(maxsize=None)
+def _build_parser():
+    """构建命令行参数解析器（只构建一次，重复调用main时复用）"""
     parser = argparse.ArgumentParser(description='实盘交易系统')
     parser.add_argument('--mode', choices=['service', 'web'], 
                        default='service', help='运行模式')
@@ -1499,21 +1898,28 @@ def main():
     parser.add_argument('--config', type=str, help='配置文件路径')
     parser.add_argument('--web-port', type=int, default=8082, help='Web界面端口')
     parser.add_argument('--web-host', default='0.0.0.0', help='Web界面监听地址')
+    return parser
+
+def _run_web(args):
+    """启动Web界面（Web依赖只在该模式下导入）"""
+    try:
+        from web.app import main as web_main
+    except ImportError as e:
+        print(f"Web界面模块导入失败: {e}")
+        print("请确保已安装Flask依赖: pip install Flask Flask-SocketIO")
+        return
     
-    args = parser.parse_args()
+    sys.argv = [sys.argv[0], '--host', args.web_host, '--port', str(args.web_port)]
+    web_main()
+
+def main():
+    """主函数"""
+    args = _build_parser().parse_args()
     
     # Web模式特殊处理
     if args.mode == 'web':
-        try:
-            from web.app import main as web_main
-            import sys
-            sys.argv = [sys.argv[0], '--host', args.web_host, '--port', str(args.web_port)]
-            web_main()
-            return
-        except ImportError as e:
-            print(f"Web界面模块导入失败: {e}")
-            print("请确保已安装Flask依赖: pip install Flask Flask-SocketIO")
-            return
+        _run_web(args)
+        return
     
     # 使用默认模式或指定模式
     mode = args.mode
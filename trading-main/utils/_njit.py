@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Numba JIT装饰器
+
+安装了numba时导出numba.njit，未安装时导出同签名的空装饰器，
+被装饰的函数退化为普通Python函数，计算结果一致。
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """未安装numba时的空装饰器"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+__all__ = ['njit', 'NUMBA_AVAILABLE']
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+ISO时间字符串批量解析内核
+
+把 "YYYY-MM-DDTHH:MM:SS[.ffffff][时区]" 逐字节解析为纪元纳秒（int64），
+时区后缀只校验不换算，与交易历史加载时直接去掉tzinfo的处理一致。
+安装了numba时以nopython模式JIT编译，未安装时退化为普通Python函数。
+"""
+
+import numpy as np
+
+from ._njit import njit
+
+# 无法解析的行返回该值，由调用方逐条回退到datetime.fromisoformat
+TS_INVALID = np.iinfo(np.int64).min
+
+_NS_PER_SEC = 1_000_000_000
+_NS_PER_DAY = 86400 * _NS_PER_SEC
+
+
+@njit(cache=True)
+def _read_digits(buf, start, n):
+    """读取n位十进制数字，遇到非数字返回-1"""
+    value = 0
+    for k in range(n):
+        c = np.int64(buf[start + k]) - 48
+        if c < 0 or c > 9:
+            return -1
+        value = value * 10 + c
+    return value
+
+
+@njit(cache=True)
+def _days_from_civil(y, m, d):
+    """公历日期转距1970-01-01的天数"""
+    if m <= 2:
+        y -= 1
+    era = (y if y >= 0 else y - 399) // 400
+    yoe = y - era * 400
+    mp = m - 3 if m > 2 else m + 9
+    doy = (153 * mp + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+@njit(cache=True)
+def _days_in_month(y, m):
+    """当月天数"""
+    if m == 2:
+        leap = (y % 4 == 0 and y % 100 != 0) or y % 400 == 0
+        return 29 if leap else 28
+    if m == 4 or m == 6 or m == 9 or m == 11:
+        return 30
+    return 31
+
+
+@njit(cache=True)
+def parse_iso_batch(buf, offs, lens):
+    """
+    批量解析ISO时间字符串
+
+    Args:
+        buf: 所有时间字符串拼接成的uint8数组
+        offs: 每个字符串在buf中的起始偏移
+        lens: 每个字符串的字节长度
+
+    Returns:
+        int64数组，每行为纪元纳秒（不含时区换算），无法解析的行为TS_INVALID
+    """
+    n = len(offs)
+    out = np.empty(n, np.int64)
+    for i in range(n):
+        s = offs[i]
+        length = lens[i]
+        out[i] = TS_INVALID
+        if length < 19:
+            continue
+        if (buf[s + 4] != 45 or buf[s + 7] != 45 or (buf[s + 10] != 84 and buf[s + 10] != 32)
+                or buf[s + 13] != 58 or buf[s + 16] != 58):
+            continue
+
+        year = _read_digits(buf, s, 4)
+        month = _read_digits(buf, s + 5, 2)
+        day = _read_digits(buf, s + 8, 2)
+        hour = _read_digits(buf, s + 11, 2)
+        minute = _read_digits(buf, s + 14, 2)
+        second = _read_digits(buf, s + 17, 2)
+        if year < 1 or month < 1 or month > 12 or day < 1 or hour < 0 or hour > 23 \
+                or minute < 0 or minute > 59 or second < 0 or second > 59:
+            continue
+        if day > _days_in_month(year, month):
+            continue
+
+        # 小数秒，最多取到纳秒
+        frac = 0
+        pos = 19
+        if pos < length and buf[s + pos] == 46:
+            pos += 1
+            digits = 0
+            while pos < length:
+                c = np.int64(buf[s + pos]) - 48
+                if c < 0 or c > 9:
+                    break
+                if digits < 9:
+                    frac = frac * 10 + c
+                    digits += 1
+                pos += 1
+            if digits == 0:
+                continue
+            for _ in range(9 - digits):
+                frac *= 10
+
+        # 剩余部分只能是时区后缀（Z 或 ±HH:MM）
+        if pos < length:
+            c = buf[s + pos]
+            if c != 90 and c != 43 and c != 45:
+                continue
+
+        days = _days_from_civil(year, month, day)
+        out[i] = (days * _NS_PER_DAY + (hour * 3600 + minute * 60 + second) * _NS_PER_SEC + frac)
+    return out
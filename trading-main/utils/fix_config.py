@@ -3,39 +3,119 @@
 # 用户配置管理功能
 # ============================================================================
 
+import heapq
 import json
+import mmap
 import os
+import time
 from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+import config as _config
+
+from ._njit import NUMBA_AVAILABLE
+from ._ts_kernel import parse_iso_batch
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # 配置文件路径
 def get_config_file_path():
-    """获取配置文件路径"""
-    import os
-    from pathlib import Path
-    
+    """获取配置文件路径（Path对象）"""
     # 获取当前文件所在目录
     current_dir = Path(__file__).parent
     
     # 尝试从当前目录开始查找json目录
     config_file = current_dir / 'json' / 'config.json'
     if config_file.exists():
-        return str(config_file)
+        return config_file
     
     # 如果当前目录下没有json目录，尝试上级目录
     config_file = current_dir.parent / 'json' / 'config.json'
     if config_file.exists():
-        return str(config_file)
+        return config_file
     
     # 如果都不存在，返回默认路径（相对于项目根目录）
-    return str(current_dir.parent / 'json' / 'config.json')
+    return current_dir.parent / 'json' / 'config.json'
+
+CONFIG_PATH = get_config_file_path()
+CONFIG_FILE = str(CONFIG_PATH)  # 兼容旧代码的字符串路径
+
+# 配置目录已确认存在后不再重复mkdir
+_config_dir_ready = False
+
+def _json_default(obj):
+    """json标准库的兜底序列化：datetime转ISO字符串，记录对象转dict，numpy标量转Python数值"""
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+def dumps_json(data):
+    """序列化为缩进2格的UTF-8字节，优先使用orjson，未安装时退化为json标准库"""
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(data, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+def dumps_json_line(data):
+    """序列化为单行JSON字节（以换行结尾），用于JSONL追加写入"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) + b'\n'
+    return (json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n').encode('utf-8')
+
+def loads_json(data):
+    """反序列化JSON（bytes或str），优先使用orjson，未安装时退化为json标准库"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
-CONFIG_FILE = get_config_file_path()
+def write_json_file(file_path, data):
+    """原子写入JSON文件：先写临时文件再os.replace，避免读取方看到写了一半的文件"""
+    file_path = Path(file_path)
+    tmp_file = file_path.with_name(file_path.name + '.tmp')
+    tmp_file.write_bytes(dumps_json(data))
+    os.replace(tmp_file, file_path)
+
+# 小于该大小的JSON文件通过mmap交给orjson解析
+MMAP_READ_MAX_BYTES = 1024 * 1024
+
+def read_json_file(file_path):
+    """
+    读取并解析JSON文件，文件为空时返回None
+    
+    安装了orjson时小文件直接把mmap映射的页缓存交给解析器，省去read()的中间缓冲区；
+    文件不存在时抛出FileNotFoundError，由调用方处理
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return None
+        if orjson is not None and size < MMAP_READ_MAX_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return orjson.loads(view)
+        content = f.read().strip()
+    return loads_json(content) if content else None
 
 def save_user_config(config_data):
     """保存用户配置到文件"""
+    global _config_dir_ready
     try:
-        from pathlib import Path
-        
         config_to_save = {
             'timestamp': datetime.now().isoformat(),
             'description': '用户自定义配置',
@@ -43,11 +123,11 @@ def save_user_config(config_data):
         }
         
         # 确保目录存在
-        config_path = Path(CONFIG_FILE)
-        config_path.parent.mkdir(parents=True, exist_ok=True)
+        if not _config_dir_ready:
+            CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            _config_dir_ready = True
         
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config_to_save, f, indent=2, ensure_ascii=False)
+        write_json_file(CONFIG_PATH, config_to_save)
         
         return True, "配置保存成功"
     except Exception as e:
@@ -56,34 +136,17 @@ def save_user_config(config_data):
 def load_user_config():
     """从文件加载用户配置"""
     try:
-        if not os.path.exists(CONFIG_FILE):
-            return False, "配置文件不存在", None
-        
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            saved_config = json.load(f)
+        saved_config = read_json_file(CONFIG_PATH)
         
         return True, "配置加载成功", saved_config['config']
+    except FileNotFoundError:
+        return False, "配置文件不存在", None
     except Exception as e:
         return False, f"配置加载失败: {e}", None
 
 def get_default_config():
     """获取默认配置"""
-    from config import (
-        TRADING_CONFIG, WINDOW_CONFIG, BACKTEST_CONFIG, 
-        EMA_CONFIG, PERIOD_CONFIG, LOGGING_CONFIG, 
-        DEBUG_CONFIG, OPTIMIZED_STRATEGY_CONFIG
-    )
-    
-    return {
-        'TRADING_CONFIG': TRADING_CONFIG.copy(),
-        'WINDOW_CONFIG': WINDOW_CONFIG.copy(),
-        'BACKTEST_CONFIG': BACKTEST_CONFIG.copy(),
-        'EMA_CONFIG': EMA_CONFIG.copy(),
-        'PERIOD_CONFIG': PERIOD_CONFIG.copy(),
-        'LOGGING_CONFIG': LOGGING_CONFIG.copy(),
-        'DEBUG_CONFIG': DEBUG_CONFIG.copy(),
-        'OPTIMIZED_STRATEGY_CONFIG': OPTIMIZED_STRATEGY_CONFIG.copy()
-    }
+    return {section: target.copy() for section, target in _SECTION_MAP.items()}
 
 def merge_configs(default_config, user_config):
     """合并默认配置和用户配置"""
@@ -93,53 +156,46 @@ def merge_configs(default_config, user_config):
         for section, values in user_config.items():
             if section in merged_config:
                 if isinstance(values, dict) and isinstance(merged_config[section], dict):
-                    merged_config[section].update(values)
+                    # 新建字典合并，不修改默认配置中的原字典
+                    merged_config[section] = {**merged_config[section], **values}
                 else:
                     merged_config[section] = values
     
     return merged_config
 
+def _deep_update(target_dict, source_dict):
+    """按嵌套结构更新字典（显式栈迭代，只有两侧都是dict时才下探）"""
+    stack = [(target_dict, source_dict)]
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            current = target.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                stack.append((current, value))
+            else:
+                target[key] = value
+
+# 用户配置中可覆盖的配置段 -> config模块中的全局字典（原地更新，引用保持不变）
+_SECTION_MAP = {
+    'TRADING_CONFIG': _config.TRADING_CONFIG,
+    'WINDOW_CONFIG': _config.WINDOW_CONFIG,
+    'BACKTEST_CONFIG': _config.BACKTEST_CONFIG,
+    'EMA_CONFIG': _config.EMA_CONFIG,
+    'PERIOD_CONFIG': _config.PERIOD_CONFIG,
+    'LOGGING_CONFIG': _config.LOGGING_CONFIG,
+    'DEBUG_CONFIG': _config.DEBUG_CONFIG,
+    'OPTIMIZED_STRATEGY_CONFIG': _config.OPTIMIZED_STRATEGY_CONFIG,
+}
+
 def apply_user_config():
     """应用用户配置到全局变量"""
     success, message, user_config = load_user_config()
     
     if success and user_config:
-        # 导入配置模块
-        import config
-        
-        # 递归更新配置函数
-        def deep_update(target_dict, source_dict):
-            """递归更新字典，支持嵌套结构"""
-            for key, value in source_dict.items():
-                if key in target_dict and isinstance(target_dict[key], dict) and isinstance(value, dict):
-                    deep_update(target_dict[key], value)
-                else:
-                    target_dict[key] = value
-        
         # 更新全局配置变量
-        if 'TRADING_CONFIG' in user_config:
-            deep_update(config.TRADING_CONFIG, user_config['TRADING_CONFIG'])
-        
-        if 'WINDOW_CONFIG' in user_config:
-            deep_update(config.WINDOW_CONFIG, user_config['WINDOW_CONFIG'])
-        
-        if 'BACKTEST_CONFIG' in user_config:
-            deep_update(config.BACKTEST_CONFIG, user_config['BACKTEST_CONFIG'])
-        
-        if 'EMA_CONFIG' in user_config:
-            deep_update(config.EMA_CONFIG, user_config['EMA_CONFIG'])
-        
-        if 'PERIOD_CONFIG' in user_config:
-            deep_update(config.PERIOD_CONFIG, user_config['PERIOD_CONFIG'])
-        
-        if 'LOGGING_CONFIG' in user_config:
-            deep_update(config.LOGGING_CONFIG, user_config['LOGGING_CONFIG'])
-        
-        if 'DEBUG_CONFIG' in user_config:
-            deep_update(config.DEBUG_CONFIG, user_config['DEBUG_CONFIG'])
-        
-        if 'OPTIMIZED_STRATEGY_CONFIG' in user_config:
-            deep_update(config.OPTIMIZED_STRATEGY_CONFIG, user_config['OPTIMIZED_STRATEGY_CONFIG'])
+        for section, target in _SECTION_MAP.items():
+            if section in user_config:
+                _deep_update(target, user_config[section])
         
         return True, "用户配置已应用"
     
@@ -148,8 +204,10 @@ def apply_user_config():
 def reset_to_default_config():
     """重置为默认配置"""
     try:
-        if os.path.exists(CONFIG_FILE):
-            os.remove(CONFIG_FILE)
+        try:
+            CONFIG_PATH.unlink()
+        except FileNotFoundError:
+            pass
         return True, "已重置为默认配置"
     except Exception as e:
         return False, f"重置配置失败: {e}"
@@ -157,7 +215,7 @@ def reset_to_default_config():
 def backup_config():
     """备份当前配置"""
     try:
-        if not os.path.exists(CONFIG_FILE):
+        if not CONFIG_PATH.exists():
             return False, "配置文件不存在，无法备份"
         
         # 创建备份文件名
@@ -166,73 +224,87 @@ def backup_config():
         
         # 复制配置文件
         import shutil
-        shutil.copy2(CONFIG_FILE, backup_file)
+        shutil.copy2(CONFIG_PATH, backup_file)
         
         return True, f"配置已备份到 {backup_file}"
     except Exception as e:
         return False, f"备份配置失败: {e}"
 
+# 嗅探备份文件头部时读取的字节数
+CONFIG_SNIFF_BYTES = 8192
+
+def _has_config_key(file_path):
+    """
+    检查配置文件是否包含顶层'config'键
+    
+    save_user_config写出的'config'键位于文件开头，先在头部查找字节串，
+    找不到时再完整解析确认，避免键顺序不同的文件被误判
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(CONFIG_SNIFF_BYTES).find(b'"config"') != -1:
+            return True
+    data = read_json_file(file_path)
+    return isinstance(data, dict) and 'config' in data
+
 def restore_config(backup_file):
     """从备份文件恢复配置"""
     try:
-        if not os.path.exists(backup_file):
-            return False, f"备份文件 {backup_file} 不存在"
-        
         # 验证备份文件格式
-        with open(backup_file, 'r', encoding='utf-8') as f:
-            backup_data = json.load(f)
-        
-        if 'config' not in backup_data:
-            return False, "备份文件格式错误"
+        try:
+            if not _has_config_key(backup_file):
+                return False, "备份文件格式错误"
+        except FileNotFoundError:
+            return False, f"备份文件 {backup_file} 不存在"
         
         # 恢复配置文件
         import shutil
-        shutil.copy2(backup_file, CONFIG_FILE)
+        shutil.copy2(backup_file, CONFIG_PATH)
         
         return True, f"配置已从 {backup_file} 恢复"
     except Exception as e:
         return False, f"恢复配置失败: {e}"
 
+def _scan_backup_files():
+    """单次遍历当前目录，返回备份文件的 (修改时间, 文件名, 路径) 列表"""
+    # scandir的DirEntry自带stat缓存，单次遍历即可取到修改时间
+    with os.scandir('.') as it:
+        return [(entry.stat().st_mtime, entry.name, entry.path) for entry in it
+                if entry.name.startswith('user_config_backup_') and entry.name.endswith('.json')]
+
 def list_backup_files():
     """列出所有备份文件"""
     try:
-        backup_files = []
-        for file in os.listdir('.'):
-            if file.startswith('user_config_backup_') and file.endswith('.json'):
-                backup_files.append(file)
-        
-        backup_files.sort(reverse=True)  # 按时间倒序排列
-        return True, "备份文件列表", backup_files
+        entries = _scan_backup_files()
+        entries.sort(reverse=True)  # 按修改时间倒序排列，同一时间按文件名
+        return True, "备份文件列表", [name for _, name, _ in entries]
     except Exception as e:
         return False, f"获取备份文件列表失败: {e}", []
 
+# 必需的配置节
+REQUIRED_CONFIG_SECTIONS = ('TRADING_CONFIG',)
+
+# TRADING_CONFIG下的字段校验规则：(子配置节, 字段, 允许的类型, 错误信息)，数值均须为正
+_TRADING_CONFIG_RULES = (
+    ('CAPITAL_CONFIG', 'INITIAL_CAPITAL', (int, float), "初始资金必须为正数"),
+    ('CAPITAL_CONFIG', 'LEVERAGE', int, "杠杆倍数必须为正整数"),
+    ('RISK_CONFIG', 'MAX_DAILY_TRADES', int, "每日最大交易次数必须为正整数"),
+)
+
 def validate_config(config_data):
     """验证配置数据的有效性"""
     try:
-        required_sections = ['TRADING_CONFIG']
-        
-        for section in required_sections:
+        for section in REQUIRED_CONFIG_SECTIONS:
             if section not in config_data:
                 return False, f"缺少必需的配置节: {section}"
         
-        # 验证交易配置
-        trading_config = config_data.get('TRADING_CONFIG', {})
-        
-        # 验证资金配置
-        capital_config = trading_config.get('CAPITAL_CONFIG', {})
-        if 'INITIAL_CAPITAL' in capital_config:
-            if not isinstance(capital_config['INITIAL_CAPITAL'], (int, float)) or capital_config['INITIAL_CAPITAL'] <= 0:
-                return False, "初始资金必须为正数"
-        
-        if 'LEVERAGE' in capital_config:
-            if not isinstance(capital_config['LEVERAGE'], int) or capital_config['LEVERAGE'] <= 0:
-                return False, "杠杆倍数必须为正整数"
-        
-        # 验证风险配置
-        risk_config = trading_config.get('RISK_CONFIG', {})
-        if 'MAX_DAILY_TRADES' in risk_config:
-            if not isinstance(risk_config['MAX_DAILY_TRADES'], int) or risk_config['MAX_DAILY_TRADES'] <= 0:
-                return False, "每日最大交易次数必须为正整数"
+        # 按规则表验证交易配置
+        trading_config = config_data['TRADING_CONFIG']
+        for section, key, types, error in _TRADING_CONFIG_RULES:
+            values = trading_config.get(section)
+            if values and key in values:
+                value = values[key]
+                if not isinstance(value, types) or value <= 0:
+                    return False, error
         
         return True, "配置验证通过"
     except Exception as e:
@@ -256,8 +328,7 @@ def export_config(export_file=None):
             'config': user_config
         }
         
-        with open(export_file, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        write_json_file(export_file, export_data)
         
         return True, f"配置已导出到 {export_file}"
     except Exception as e:
@@ -266,22 +337,22 @@ def export_config(export_file=None):
 def import_config(import_file):
     """从指定文件导入配置"""
     try:
-        if not os.path.exists(import_file):
+        try:
+            import_data = read_json_file(import_file)
+        except FileNotFoundError:
             return False, f"导入文件 {import_file} 不存在"
         
-        with open(import_file, 'r', encoding='utf-8') as f:
-            import_data = json.load(f)
-        
-        if 'config' not in import_data:
+        if not isinstance(import_data, dict) or 'config' not in import_data:
             return False, "导入文件格式错误"
         
         # 验证配置
-        success, message = validate_config(import_data['config'])
+        user_config = import_data['config']
+        success, message = validate_config(user_config)
         if not success:
             return False, f"配置验证失败: {message}"
         
-        # 保存配置
-        return save_user_config(import_data['config'])
+        # 保存配置：直接使用已解析的配置对象，只序列化一次
+        return save_user_config(user_config)
     except Exception as e:
         return False, f"导入配置失败: {e}"
 
@@ -289,15 +360,20 @@ def import_config(import_file):
 def get_config_info():
     """获取配置信息"""
     try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+        try:
+            st = CONFIG_PATH.stat()
+        except FileNotFoundError:
+            st = None
+        
+        if st is not None:
+            with open(CONFIG_PATH, 'rb') as f:
+                config_data = loads_json(f.read())
             
             return {
                 'exists': True,
                 'timestamp': config_data.get('timestamp', 'N/A'),
                 'description': config_data.get('description', 'N/A'),
-                'size': os.path.getsize(CONFIG_FILE)
+                'size': st.st_size
             }
         else:
             return {
@@ -317,22 +393,20 @@ def get_config_info():
 def clean_old_backups(keep_count=5):
     """清理旧的备份文件，保留最新的几个"""
     try:
-        success, message, backup_files = list_backup_files()
-        if not success:
-            return False, message
+        entries = _scan_backup_files()
         
-        if len(backup_files) <= keep_count:
-            return True, f"备份文件数量({len(backup_files)})未超过保留数量({keep_count})"
+        if len(entries) <= keep_count:
+            return True, f"备份文件数量({len(entries)})未超过保留数量({keep_count})"
         
-        # 删除多余的备份文件
-        files_to_delete = backup_files[keep_count:]
+        # 只挑出最旧的多余文件删除，无需整体排序
+        files_to_delete = heapq.nsmallest(len(entries) - keep_count, entries)
         deleted_count = 0
         
-        for file in files_to_delete:
+        for _, file, path in files_to_delete:
             try:
-                os.remove(file)
+                os.unlink(path)
                 deleted_count += 1
-            except Exception as e:
+            except OSError as e:
                 print(f"删除备份文件 {file} 失败: {e}")
         
         return True, f"已删除 {deleted_count} 个旧备份文件"
@@ -343,88 +417,216 @@ def clean_old_backups(keep_count=5):
 # 交易数据JSON文件管理
 # ============================================================================
 
-def save_trade_history(trade_history):
-    """保存交易历史到JSON文件"""
+# 交易数据目录（相对运行目录），确认存在后不再重复mkdir
+JSON_DIR = Path('json')
+_json_dir_ready = False
+
+def ensure_json_dir():
+    """首次写入前创建json目录，之后直接返回目录路径"""
+    global _json_dir_ready
+    if not _json_dir_ready:
+        JSON_DIR.mkdir(exist_ok=True)
+        _json_dir_ready = True
+    return JSON_DIR
+
+# 逐笔追加的交易记录日志（JSONL），与trade_history.json快照一起构成完整交易历史
+TRADES_LOG_NAME = 'trades.jsonl'
+# 压缩时追加日志先改名为该文件，合并进快照后删除
+TRADES_COMPACTING_NAME = 'trades.jsonl.compacting'
+
+def open_trades_log():
+    """以追加模式打开交易记录日志，返回二进制文件对象"""
+    return open(ensure_json_dir() / TRADES_LOG_NAME, 'ab', buffering=1024 * 1024)
+
+def append_trade_record(trades_log, trade):
+    """向交易记录日志追加一条记录，写入用户态缓冲区，由调用方决定何时flush"""
+    trades_log.write(dumps_json_line(trade))
+
+def compact_trade_history():
+    """
+    将交易记录日志合并进trade_history.json快照，完整历史只在磁盘上合并
+    
+    追加日志先改名为trades.jsonl.compacting再合并，合并完成后删除；调用方需在之后重新打开追加日志。
+    上次压缩中断留下的trades.jsonl.compacting会先合并（快照末尾已包含这些记录时不重复合并）
+    """
     try:
-        from pathlib import Path
-        
-        # 确保json目录存在
-        json_dir = Path('json')
-        json_dir.mkdir(exist_ok=True)
-        
-        # 转换datetime对象为字符串
-        history_to_save = []
-        for trade in trade_history:
-            trade_copy = trade.copy()
-            if 'timestamp' in trade_copy and hasattr(trade_copy['timestamp'], 'isoformat'):
-                trade_copy['timestamp'] = trade_copy['timestamp'].isoformat()
-            history_to_save.append(trade_copy)
-        
-        # 保存到文件
-        history_file = json_dir / 'trade_history.json'
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history_to_save, f, indent=2, ensure_ascii=False)
+        json_dir = ensure_json_dir()
+        compacting = json_dir / TRADES_COMPACTING_NAME
         
-        return True, f"交易历史已保存: {len(trade_history)} 条记录"
+        if compacting.exists():
+            history_data = _merge_compacting(json_dir, recovering=True)
+        else:
+            history_data = None
+        
+        trades_log = json_dir / TRADES_LOG_NAME
+        try:
+            has_journal = trades_log.stat().st_size > 0
+        except FileNotFoundError:
+            has_journal = False
+        if has_journal:
+            os.replace(trades_log, compacting)
+            history_data = _merge_compacting(json_dir)
+        
+        if history_data is None:
+            return True, "交易记录日志为空，无需合并"
+        return True, f"交易历史已保存: {len(history_data)} 条记录"
     except Exception as e:
         return False, f"保存交易历史失败: {e}"
 
+def _merge_compacting(json_dir, recovering=False):
+    """把trades.jsonl.compacting合并进快照后删除，返回合并后的完整历史"""
+    compacting = json_dir / TRADES_COMPACTING_NAME
+    history_file = json_dir / 'trade_history.json'
+    journal = _read_trades_log(compacting)
+    history_data = _read_history_snapshot(history_file)
+    
+    # 上次压缩在写入快照之后、删除文件之前中断时，快照末尾已经是这些记录
+    if journal and not (recovering and history_data[-len(journal):] == journal):
+        history_data.extend(journal)
+        write_json_file(history_file, history_data)
+    compacting.unlink()
+    return history_data
+
+# 交易历史快照超过该大小且安装了ijson时改为流式解析
+STREAM_PARSE_MIN_BYTES = 50 * 1024 * 1024
+
+def _read_history_snapshot(history_file):
+    """
+    读取交易历史快照文件
+    
+    大文件逐条流式解析，避免整个文件的字节串和解析结果同时驻留内存
+    """
+    try:
+        size = history_file.stat().st_size
+    except FileNotFoundError:
+        return []
+    if size == 0:
+        return []
+    
+    if ijson is not None and size >= STREAM_PARSE_MIN_BYTES:
+        with open(history_file, 'rb') as f:
+            return list(ijson.items(f, 'item', use_float=True))
+    
+    content = history_file.read_bytes().strip()
+    return loads_json(content) if content else []
+
+@lru_cache(maxsize=8192)
+def _parse_ts(s):
+    """
+    解析ISO时间字符串为不带时区的datetime
+    
+    同一根K线上的多笔交易时间戳相同，缓存后重复的字符串不再重新解析
+    """
+    # fromisoformat 在3.11之前不支持'Z'后缀
+    if s.endswith('Z'):
+        s = s[:-1] + '+00:00'
+    parsed_time = datetime.fromisoformat(s)
+    # 如果解析出的时间带时区，则移除时区信息，确保时区一致性
+    return parsed_time.replace(tzinfo=None) if parsed_time.tzinfo is not None else parsed_time
+
+def _convert_trade_timestamp(trade):
+    """将交易记录中的字符串时间转换为datetime对象"""
+    if 'timestamp' in trade and isinstance(trade['timestamp'], str):
+        try:
+            trade['timestamp'] = _parse_ts(trade['timestamp'])
+        except Exception as e:
+            print(f"解析timestamp失败: {e}, 使用None")
+            trade['timestamp'] = None
+
+# 记录数达到该值且安装了numba时，时间戳改用JIT批量解析
+BATCH_TS_MIN_TRADES = 5000
+
+def _convert_trade_timestamps(trades):
+    """
+    批量将交易记录中的字符串时间转换为datetime对象
+    
+    记录较多且安装了numba时，先把时间字符串拼成一块字节缓冲区交给JIT内核解析为纳秒，
+    再由numpy一次性转换为datetime；内核无法解析的行逐条回退到fromisoformat
+    """
+    if not NUMBA_AVAILABLE or len(trades) < BATCH_TS_MIN_TRADES:
+        for trade in trades:
+            _convert_trade_timestamp(trade)
+        return
+    
+    pending = [trade for trade in trades if isinstance(trade.get('timestamp'), str)]
+    if not pending:
+        return
+    
+    encoded = [trade['timestamp'].encode('ascii', 'replace') for trade in pending]
+    lens = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    offs = np.zeros_like(lens)
+    np.cumsum(lens[:-1], out=offs[1:])
+    buf = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    
+    # 无法解析的行在纳秒视图中为NaT，转换为object后为None
+    parsed = parse_iso_batch(buf, offs, lens).view('datetime64[ns]').astype('datetime64[us]').astype(object)
+    for trade, value in zip(pending, parsed):
+        if value is None:
+            _convert_trade_timestamp(trade)
+        else:
+            trade['timestamp'] = value
+
+def _read_trades_log(trades_log=None):
+    """读取交易记录日志中的全部记录，跳过写了一半的末行"""
+    if trades_log is None:
+        trades_log = JSON_DIR / TRADES_LOG_NAME
+    if not trades_log.exists():
+        return []
+    
+    records = []
+    with open(trades_log, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(loads_json(line))
+            except ValueError:
+                continue
+    return records
+
 def load_trade_history():
     """从JSON文件加载交易历史"""
     try:
-        from pathlib import Path
-        from datetime import datetime
+        # 上次压缩中断时先完成合并，避免改名后的日志被遗漏或重复计入
+        if (JSON_DIR / TRADES_COMPACTING_NAME).exists():
+            compact_trade_history()
         
-        history_file = Path('json/trade_history.json')
-        if not history_file.exists():
-            return True, "未找到交易历史文件，将创建新的历史记录", []
+        history_data = _read_history_snapshot(JSON_DIR / 'trade_history.json')
         
-        # 检查文件是否为空
-        if history_file.stat().st_size == 0:
-            return True, "交易历史文件为空，将创建新的历史记录", []
-        
-        with open(history_file, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return True, "交易历史文件为空，将创建新的历史记录", []
-            
-            history_data = json.loads(content)
+        # 合并快照之后追加的交易记录
+        history_data.extend(_read_trades_log())
+        if not history_data:
+            return True, "未找到交易历史记录，将创建新的历史记录", []
         
         # 转换字符串为datetime对象
-        for trade in history_data:
-            if 'timestamp' in trade and isinstance(trade['timestamp'], str):
-                try:
-                    # 解析时间字符串，确保时区一致性
-                    parsed_time = datetime.fromisoformat(trade['timestamp'])
-                    # 如果解析出的时间带时区，则移除时区信息
-                    if parsed_time.tzinfo is not None:
-                        trade['timestamp'] = parsed_time.replace(tzinfo=None)
-                    else:
-                        trade['timestamp'] = parsed_time
-                except Exception as e:
-                    print(f"解析timestamp失败: {e}, 使用None")
-                    trade['timestamp'] = None
+        _convert_trade_timestamps(history_data)
         
         return True, f"交易历史已加载: {len(history_data)} 条记录", history_data
     except Exception as e:
         return False, f"加载交易历史失败: {e}", []
 
+# 状态时间戳按秒缓存，同一秒内的多次保存复用同一字符串
+_status_ts_sec = None
+_status_ts_str = ''
+
+def status_timestamp():
+    """返回当前时间的ISO字符串（精确到秒），秒数变化时才重新格式化"""
+    global _status_ts_sec, _status_ts_str
+    now = int(time.time())
+    if now != _status_ts_sec:
+        _status_ts_str = datetime.fromtimestamp(now).isoformat()
+        _status_ts_sec = now
+    return _status_ts_str
+
 def save_trading_status(position_data):
     """保存交易系统状态到JSON文件"""
     try:
-        from pathlib import Path
-        
-        # 确保json目录存在
-        json_dir = Path('json')
-        json_dir.mkdir(exist_ok=True)
-        
         # 添加时间戳
-        position_data['timestamp'] = datetime.now().isoformat()
+        position_data['timestamp'] = status_timestamp()
         
         # 保存到文件
-        trading_file = json_dir / 'trading_status.json'
-        with open(trading_file, 'w', encoding='utf-8') as f:
-            json.dump(position_data, f, indent=2, ensure_ascii=False)
+        write_json_file(ensure_json_dir() / 'trading_status.json', position_data)
         
         return True, "交易系统状态已保存"
     except Exception as e:
@@ -433,34 +635,19 @@ def save_trading_status(position_data):
 def load_trading_status():
     """从JSON文件加载交易系统状态"""
     try:
-        from pathlib import Path
-        from datetime import datetime
-        
-        trading_file = Path('json/trading_status.json')
-        if not trading_file.exists():
+        try:
+            position_data = read_json_file(JSON_DIR / 'trading_status.json')
+        except FileNotFoundError:
             return True, "未找到交易系统状态文件", {}
         
         # 检查文件是否为空
-        if trading_file.stat().st_size == 0:
+        if position_data is None:
             return True, "交易系统状态文件为空，将创建新的状态", {}
         
-        with open(trading_file, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return True, "交易系统状态文件为空，将创建新的状态", {}
-            
-            position_data = json.loads(content)
-        
         # 转换时间戳字符串为datetime对象
         if 'last_trade_time' in position_data and position_data['last_trade_time']:
             try:
-                # 解析时间字符串，确保时区一致性
-                parsed_time = datetime.fromisoformat(position_data['last_trade_time'])
-                # 如果解析出的时间带时区，则移除时区信息
-                if parsed_time.tzinfo is not None:
-                    position_data['last_trade_time'] = parsed_time.replace(tzinfo=None)
-                else:
-                    position_data['last_trade_time'] = parsed_time
+                position_data['last_trade_time'] = _parse_ts(position_data['last_trade_time'])
             except Exception as e:
                 print(f"解析last_trade_time失败: {e}, 使用None")
                 position_data['last_trade_time'] = None
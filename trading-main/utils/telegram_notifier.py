@@ -11,15 +11,156 @@ Telegram通知模块
 
 import asyncio
 import os
+import re
+import time
+import queue
+import atexit
+import random
 import logging
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+from html import escape as _html_escape, unescape as _html_unescape
 from typing import Optional, Dict, Any
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from config import TELEGRAM_CONFIG
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+def _dumps_payload(payload: Dict[str, Any]) -> bytes:
+    """序列化请求体为UTF-8字节，优先使用orjson，未安装时退化为json标准库"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+# 文本清理用的正则：HTML标签、连续空白
+_TAG_RE = re.compile(r'<[^>]*>')
+_WS_RE = re.compile(r'\s+')
+
+# Telegram HTML模式校验：支持的标签、标签匹配、未转义的&
+_HTML_TAG_RE = re.compile(r'<(/?)([a-zA-Z]+)(?:\s[^<>]*)?>')
+_ALLOWED_HTML_TAGS = frozenset(('b', 'i', 'u', 's', 'a', 'code', 'pre'))
+_BARE_AMP_RE = re.compile(r'&(?!(?:[a-zA-Z]+|#[0-9]+|#x[0-9a-fA-F]+);)')
+
+def _is_valid_html(message: str) -> bool:
+    """检查消息能否按Telegram HTML模式解析：只含支持的标签且正确闭合，没有游离的<、>、&"""
+    if _BARE_AMP_RE.search(message):
+        return False
+    stack = []
+    pos = 0
+    for match in _HTML_TAG_RE.finditer(message):
+        between = message[pos:match.start()]
+        if '<' in between or '>' in between:
+            return False
+        closing, tag = match.group(1), match.group(2).lower()
+        if tag not in _ALLOWED_HTML_TAGS:
+            return False
+        if closing:
+            if not stack or stack.pop() != tag:
+                return False
+        else:
+            stack.append(tag)
+        pos = match.end()
+    tail = message[pos:]
+    return not stack and '<' not in tail and '>' not in tail
+
+def _html_to_plain(message: str) -> str:
+    """去掉HTML标签并还原转义字符，得到纯文本消息"""
+    return _html_unescape(_TAG_RE.sub('', message))
+
+# 不小于该长度的文本才进入清理缓存
+CLEAN_CACHE_MIN_LENGTH = 32
+
+def _clean_html(text: str) -> str:
+    """移除HTML标签、转义特殊字符并合并空白"""
+    # 移除所有HTML标签（先处理）
+    text = _TAG_RE.sub('', text)
+    
+    # 替换HTML特殊字符（html.escape先处理&，不会二次转义）
+    text = _html_escape(text, quote=False)
+    
+    # 移除多余的空格和换行
+    text = _WS_RE.sub(' ', text)
+    
+    return text.strip()
+
+# 纯函数，按输入缓存清理结果，容量有限
+_clean_html_cached = lru_cache(maxsize=256)(_clean_html)
+
+# 发送重试：429按Retry-After等待，网络异常按指数退避，均带随机抖动
+SEND_MAX_ATTEMPTS = 5
+SEND_BACKOFF_BASE = 1.0  # 秒
+SEND_MAX_RETRY_AFTER = 60  # 秒
+
+# 后台发送队列容量，满时丢弃新消息
+SEND_QUEUE_SIZE = 256
+# 错误告警/连通性测试使用的高优先级队列容量
+PRIORITY_QUEUE_SIZE = 64
+
+# 合并发送：首条消息到达后再等待该窗口，期间入队的消息拼成一条发送
+BATCH_WINDOW = 0.2  # 秒
+BATCH_SEPARATOR = "\n\n───\n\n"
+MAX_MESSAGE_LENGTH = 4096  # Telegram单条消息长度上限
+
+# 重复通知去重：最近发送过的信号/告警在TTL内不再重复发送
+DEDUPE_CACHE_SIZE = 32
+DEDUPE_TTL = 300  # 秒
+# 参与内容去重的状态类型（启动/停止等状态通知每次都发送）
+DEDUPE_STATUS_TYPES = ('error', 'warning')
+
+# 信号方向 -> (图标, 文本)
+_SIGNAL_META = {
+    1: ("🟢", "多头信号"),
+    -1: ("🔴", "空头信号"),
+    0: ("⚪", "观望信号"),
+}
+
+# 信号来源 -> (图标, 文本)
+_SOURCE_META = {
+    'traditional': ("📊", "指标分析"),
+    'deepseek': ("🤖", "DeepSeek AI分析"),
+    'integrated': ("🔄", "指标+AI整合"),
+}
+_UNKNOWN_SOURCE = ("❓", "未知来源")
+
+# 状态类型 -> 图标
+_STATUS_ICONS = {
+    'info': "ℹ️",
+    'success': "✅",
+    'warning': "⚠️",
+    'error': "❌",
+    'start': "🚀",
+    'stop': "⏹️"
+}
+
+# 消息时间字符串按秒缓存：[秒, 格式化结果]
+_TS_CACHE = [None, '']
+
+def _now_str() -> str:
+    """返回当前时间字符串（%Y-%m-%d %H:%M:%S），同一秒内复用上次的格式化结果"""
+    now = int(time.time())
+    cache = _TS_CACHE
+    if cache[0] != now:
+        cache[1] = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+        cache[0] = now
+    return cache[1]
+
 class TelegramNotifier:
     """Telegram通知器"""
     
@@ -30,10 +171,41 @@ class TelegramNotifier:
         
         self.enabled = bool(self.bot_token and self.chat_id)
         
-        # 添加评分缓存，用于避免重复发送相同评分的消息
+        # 复用连接池的HTTP会话，连续通知共用同一条TCP+TLS连接；
+        # 信号/交易/状态等批量消息与错误告警/连通性测试分别使用独立连接池，互不占用连接
+        self._url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        self._sess_bulk = requests.Session()
+        self._sess_bulk.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+        self._sess_priority = requests.Session()
+        self._sess_priority.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+        
+        # 后台发送线程：调用方只负责入队，网络请求与重试不阻塞调用线程；
+        # 高优先级消息有自己的队列和线程，不会排在积压的批量消息或限流重试之后（键为priority）
+        self._send_qs = {
+            False: queue.Queue(maxsize=SEND_QUEUE_SIZE),
+            True: queue.Queue(maxsize=PRIORITY_QUEUE_SIZE),
+        }
+        self._sender_threads = {False: None, True: None}
+        self._sender_lock = threading.Lock()
+        
+        # asyncio调用方使用的异步HTTP客户端及创建它的事件循环；连接池绑定该事件循环，
+        # 在其他事件循环（如再次调用asyncio.run）中发送时重新创建
+        self._aclient = None
+        self._aclient_loop = None
+        
+        if self.enabled:
+            # 进程退出前发送完队列中剩余的消息
+            atexit.register(self.close)
+        
+        # 添加评分缓存，用于避免重复发送相同评分的消息（发送时间为time.monotonic()秒数）
         self.last_signal_score = None
         self.last_signal_time = None
         
+        # 最近发送记录：去重键 -> 发送时的monotonic时间，按发送先后排列
+        self._recent_signals = OrderedDict()
+        self._recent_alerts = OrderedDict()
+        self._dedupe_lock = threading.Lock()
+        
         if not self.enabled:
             logger.warning("Telegram通知未配置：缺少BOT_TOKEN或CHAT_ID")
         else:
@@ -43,19 +215,10 @@ class TelegramNotifier:
         """清理文本中的HTML特殊字符"""
         if not text:
             return ""
-        
-        # 移除所有HTML标签（先处理）
-        import re
-        text = re.sub(r'<[^>]*>', '', text)
-        
-        # 替换HTML特殊字符
-        text = text.replace('<', '&lt;').replace('>', '&gt;')
-        text = text.replace('&', '&amp;')
-        
-        # 移除多余的空格和换行
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        # 短文本直接清理，避免占用缓存；较长的理由/建议文本在相邻tick间经常重复
+        if len(text) < CLEAN_CACHE_MIN_LENGTH:
+            return _clean_html(text)
+        return _clean_html_cached(text)
     
     def _format_signal_message(self, signal_data: Dict[str, Any]) -> str:
         """格式化信号消息"""
@@ -70,47 +233,25 @@ class TelegramNotifier:
         clean_reason = self._clean_html_text(reason)
         clean_advice = self._clean_html_text(investment_advice)
         
-        # 信号图标
-        if signal_type == 1:
-            signal_icon = "🟢"
-            signal_text = "多头信号"
-        elif signal_type == -1:
-            signal_icon = "🔴"
-            signal_text = "空头信号"
-        else:
-            signal_icon = "⚪"
-            signal_text = "观望信号"
-        
-        # 信号来源图标和文本
-        if signal_from == 'traditional':
-            source_icon = "📊"
-            source_text = "指标分析"
-        elif signal_from == 'deepseek':
-            source_icon = "🤖"
-            source_text = "DeepSeek AI分析"
-        elif signal_from == 'integrated':
-            source_icon = "🔄"
-            source_text = "指标+AI整合"
-        else:
-            source_icon = "❓"
-            source_text = "未知来源"
-        
-        # 构建消息 - 使用更安全的HTML格式
-        message = f"🚨 <b>ETHUSDT交易信号</b>\n\n"
-        message += f"{signal_icon} <b>{signal_text}</b>\n"
-        message += f"{source_icon} <b>信号来源: {source_text}</b>\n"
-        message += f"💰 当前价格: <code>${price:,.2f}</code>\n"
-        message += f"综合评分: <code>{score:.3f}</code>\n"
-        message += f"🔍 信号原因: {clean_reason}\n"
+        # 信号及来源的图标和文本
+        signal_icon, signal_text = _SIGNAL_META.get(signal_type, _SIGNAL_META[0])
+        source_icon, source_text = _SOURCE_META.get(signal_from, _UNKNOWN_SOURCE)
         
         # 添加投资建议
-        if clean_advice:
-            message += f"\n📋 <b>投资建议:</b>\n{clean_advice}\n"
-        
-        message += f"\n🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        message += f"时间级别: 1h"
+        advice = f"\n📋 <b>投资建议:</b>\n{clean_advice}\n" if clean_advice else ""
         
-        return message
+        # 构建消息 - 使用更安全的HTML格式
+        return (
+            f"🚨 <b>ETHUSDT交易信号</b>\n\n"
+            f"{signal_icon} <b>{signal_text}</b>\n"
+            f"{source_icon} <b>信号来源: {source_text}</b>\n"
+            f"💰 当前价格: <code>${price:,.2f}</code>\n"
+            f"综合评分: <code>{score:.3f}</code>\n"
+            f"🔍 信号原因: {clean_reason}\n"
+            f"{advice}"
+            f"\n🕐 时间: {_now_str()}\n"
+            f"时间级别: 1h"
+        )
     
     def _format_trade_message(self, trade_data: Dict[str, Any]) -> str:
         """格式化交易消息"""
@@ -129,28 +270,28 @@ class TelegramNotifier:
             action_text = "平仓"
         
         # 构建消息 - 使用更安全的HTML格式
-        message = f"{action_icon} <b>ETHUSDT交易执行</b>\n\n"
-        message += f"操作: <b>{action_text}</b>\n"
-        message += f"💰 价格: <code>${price:,.2f}</code>\n"
-        message += f"数量: <code>{quantity:.4f} ETH</code>\n"
-        message += f"💵 价值: <code>${quantity * price:,.2f} USDT</code>\n"
+        parts = [
+            f"{action_icon} <b>ETHUSDT交易执行</b>\n\n"
+            f"操作: <b>{action_text}</b>\n"
+            f"💰 价格: <code>${price:,.2f}</code>\n"
+            f"数量: <code>{quantity:.4f} ETH</code>\n"
+            f"💵 价值: <code>${quantity * price:,.2f} USDT</code>\n"
+        ]
         
         if action == 'close' and pnl is not None:
             pnl_icon = "📈" if pnl > 0 else "📉"
-            message += f"{pnl_icon} 盈亏: <code>${pnl:,.2f}</code>\n"
+            parts.append(f"{pnl_icon} 盈亏: <code>${pnl:,.2f}</code>\n")
         
         # 添加交易原因
         if reason:
             # 清理原因中的特殊字符
             clean_reason = self._clean_html_text(reason)
-            if action == 'open':
-                message += f"🔍 开仓原因: {clean_reason}\n"
-            else:
-                message += f"🔍 平仓原因: {clean_reason}\n"
+            reason_label = "开仓原因" if action == 'open' else "平仓原因"
+            parts.append(f"🔍 {reason_label}: {clean_reason}\n")
         
-        message += f"\n🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        parts.append(f"\n🕐 时间: {_now_str()}")
         
-        return message
+        return "".join(parts)
     
     def _format_status_message(self, status_data: Dict[str, Any]) -> str:
         """格式化状态消息"""
@@ -159,64 +300,286 @@ class TelegramNotifier:
         content = status_data.get('content', '')
         
         # 状态图标
-        status_icons = {
-            'info': "ℹ️",
-            'success': "✅", 
-            'warning': "⚠️",
-            'error': "❌",
-            'start': "🚀",
-            'stop': "⏹️"
-        }
-        
-        icon = status_icons.get(status_type, "ℹ️")
+        icon = _STATUS_ICONS.get(status_type, "ℹ️")
         
         # 清理内容中的特殊字符
         clean_content = self._clean_html_text(content)
         
-        message = f"{icon} <b>{title}</b>\n\n"
-        message += f"{clean_content}\n\n"
-        message += f"🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        
-        return message
+        return f"{icon} <b>{title}</b>\n\n{clean_content}\n\n🕐 时间: {_now_str()}"
     
-    def send_message(self, message: str, parse_mode: str = 'HTML') -> bool:
-        """发送消息到Telegram"""
+    def send_message(self, message: str, parse_mode: str = 'HTML', priority: bool = False,
+                     on_done=None) -> bool:
+        """
+        将消息放入发送队列，由后台线程发送到Telegram
+        
+        返回True只表示已入队，队列已满时丢弃并返回False；实际发送结果由后台线程以
+        on_done(success)回调通知。priority为True时走高优先级队列和连接池，用于错误告警等关键消息
+        """
         if not self.enabled:
             logger.debug("Telegram通知未启用")
             return False
         
+        message, parse_mode = self._prepare_message(message, parse_mode)
+        self._ensure_sender(priority)
+        try:
+            self._send_qs[priority].put_nowait((message, parse_mode, on_done))
+            return True
+        except queue.Full:
+            logger.warning("Telegram发送队列已满，丢弃消息")
+            return False
+    
+    @staticmethod
+    def _prepare_message(message: str, parse_mode: str):
+        """HTML无法解析时直接按纯文本发送，避免被Telegram拒绝后再重发一次"""
+        if parse_mode == 'HTML' and not _is_valid_html(message):
+            logger.debug("消息HTML格式无效，改为纯文本发送")
+            return _html_to_plain(message), None
+        return message, parse_mode
+    
+    def _ensure_sender(self, priority: bool = False):
+        """对应优先级的后台发送线程未运行时启动"""
+        thread = self._sender_threads[priority]
+        if thread is not None and thread.is_alive():
+            return
+        with self._sender_lock:
+            thread = self._sender_threads[priority]
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._sender_loop, args=(priority,),
+                                          name='TelegramPriority' if priority else 'TelegramSender',
+                                          daemon=True)
+                self._sender_threads[priority] = thread
+                thread.start()
+    
+    def _sender_loop(self, priority: bool = False):
+        """后台发送线程：按入队顺序合并发送，收到None时发送完已取出的消息后退出"""
+        send_q = self._send_qs[priority]
+        while True:
+            item = send_q.get()
+            if item is None:
+                return
+            
+            # 在合并窗口内继续收集消息
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + BATCH_WINDOW
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = send_q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            for message, parse_mode, callbacks in self._merge_batch(batch):
+                success = self._send_now(message, parse_mode, priority)
+                for on_done in callbacks:
+                    try:
+                        on_done(success)
+                    except Exception as e:
+                        logger.error(f"Telegram发送回调异常: {e}")
+            if stopping:
+                return
+    
+    @staticmethod
+    def _merge_batch(batch):
+        """把相邻且格式相同的消息拼接起来，每条不超过Telegram长度上限；返回(消息, 格式, 回调列表)"""
+        merged = []
+        for message, parse_mode, on_done in batch:
+            callbacks = [on_done] if on_done is not None else []
+            if merged:
+                last_message, last_mode, last_callbacks = merged[-1]
+                combined_length = len(last_message) + len(BATCH_SEPARATOR) + len(message)
+                if last_mode == parse_mode and combined_length <= MAX_MESSAGE_LENGTH:
+                    merged[-1] = (last_message + BATCH_SEPARATOR + message, parse_mode,
+                                  last_callbacks + callbacks)
+                    continue
+            merged.append((message, parse_mode, callbacks))
+        return merged
+    
+    def close(self, timeout: float = 10):
+        """发送完队列中的消息后停止后台发送线程"""
+        running = []
+        for priority, thread in self._sender_threads.items():
+            if thread is None or not thread.is_alive():
+                continue
+            try:
+                self._send_qs[priority].put(None, timeout=timeout)
+            except queue.Full:
+                logger.warning("Telegram发送队列已满，停止发送线程超时")
+                continue
+            running.append(thread)
+        for thread in running:
+            thread.join(timeout)
+    
+    def _send_now(self, message: str, parse_mode: str = 'HTML', priority: bool = False) -> bool:
+        """在当前线程同步发送消息到Telegram，priority为True时使用高优先级连接池"""
+        session = self._sess_priority if priority else self._sess_bulk
         try:
             # 调试：检查消息长度和内容
             if len(message) > 200:
                 logger.debug(f"消息长度: {len(message)} 字符")
                 logger.debug(f"消息前200字符: {message[:200]}")
             
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            
-            payload = {
+            # 请求体在重试循环外只序列化一次
+            body = _dumps_payload({
                 'chat_id': self.chat_id,
                 'text': message,
                 'parse_mode': parse_mode,
                 'disable_web_page_preview': True
-            }
+            })
             
-            response = requests.post(url, json=payload, timeout=10)
+            backoff = SEND_BACKOFF_BASE
+            for attempt in range(1, SEND_MAX_ATTEMPTS + 1):
+                try:
+                    response = session.post(self._url, data=body, headers=_JSON_HEADERS, timeout=10)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if attempt == SEND_MAX_ATTEMPTS:
+                        raise
+                    logger.warning(f"Telegram网络异常，{backoff:.0f}秒后重试 ({attempt}/{SEND_MAX_ATTEMPTS}): {e}")
+                    time.sleep(backoff * random.uniform(1.0, 1.5))
+                    backoff *= 2
+                    continue
+                
+                if response.status_code == 200:
+                    logger.info(" Telegram消息发送成功")
+                    return True
+                
+                if response.status_code == 429 and attempt < SEND_MAX_ATTEMPTS:
+                    retry_after = self._retry_after(response)
+                    logger.warning(f"Telegram限流，{retry_after}秒后重试 ({attempt}/{SEND_MAX_ATTEMPTS})")
+                    time.sleep(retry_after * random.uniform(1.0, 1.5))
+                    continue
+                
+                logger.error(f"Telegram消息发送失败: {response.status_code} - {response.text}")
+                # HTML已在入队前校验，仅在Telegram仍报解析错误(400)时改用纯文本重发一次
+                if parse_mode == 'HTML' and response.status_code == 400:
+                    logger.debug("尝试使用纯文本格式发送...")
+                    return self._send_now(_html_to_plain(message), parse_mode=None, priority=priority)
+                return False
+                
+        except Exception as e:
+            logger.error(f"Telegram消息发送异常: {e}")
+            return False
+    
+    def _get_async_client(self):
+        """返回当前事件循环中复用连接池的异步HTTP客户端，未安装h2时退回HTTP/1.1"""
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            # 旧客户端的连接属于已结束的事件循环，无法再使用，直接丢弃
+            limits = httpx.Limits(max_keepalive_connections=8, max_connections=16)
+            try:
+                self._aclient = httpx.AsyncClient(http2=True, limits=limits, timeout=10.0)
+            except ImportError:
+                self._aclient = httpx.AsyncClient(limits=limits, timeout=10.0)
+            self._aclient_loop = loop
+        return self._aclient
+    
+    async def send_message_async(self, message: str, parse_mode: str = 'HTML') -> bool:
+        """
+        在asyncio事件循环中发送消息，不阻塞事件循环
+        
+        安装了httpx时使用异步客户端直接发送（重试策略与同步发送一致），
+        未安装时在线程池中执行同步发送
+        """
+        if not self.enabled:
+            logger.debug("Telegram通知未启用")
+            return False
+        
+        message, parse_mode = self._prepare_message(message, parse_mode)
+        if httpx is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._send_now, message, parse_mode)
+        
+        try:
+            client = self._get_async_client()
+            body = _dumps_payload({
+                'chat_id': self.chat_id,
+                'text': message,
+                'parse_mode': parse_mode,
+                'disable_web_page_preview': True
+            })
             
-            if response.status_code == 200:
-                logger.info(" Telegram消息发送成功")
-                return True
-            else:
+            backoff = SEND_BACKOFF_BASE
+            for attempt in range(1, SEND_MAX_ATTEMPTS + 1):
+                try:
+                    response = await client.post(self._url, content=body, headers=_JSON_HEADERS)
+                except httpx.TransportError as e:
+                    if attempt == SEND_MAX_ATTEMPTS:
+                        raise
+                    logger.warning(f"Telegram网络异常，{backoff:.0f}秒后重试 ({attempt}/{SEND_MAX_ATTEMPTS}): {e}")
+                    await asyncio.sleep(backoff * random.uniform(1.0, 1.5))
+                    backoff *= 2
+                    continue
+                
+                if response.status_code == 200:
+                    logger.info(" Telegram消息发送成功")
+                    return True
+                
+                if response.status_code == 429 and attempt < SEND_MAX_ATTEMPTS:
+                    retry_after = self._retry_after(response)
+                    logger.warning(f"Telegram限流，{retry_after}秒后重试 ({attempt}/{SEND_MAX_ATTEMPTS})")
+                    await asyncio.sleep(retry_after * random.uniform(1.0, 1.5))
+                    continue
+                
                 logger.error(f"Telegram消息发送失败: {response.status_code} - {response.text}")
-                # 调试：如果失败，尝试不使用HTML格式
-                if parse_mode == 'HTML':
+                if parse_mode == 'HTML' and response.status_code == 400:
                     logger.debug("尝试使用纯文本格式发送...")
-                    return self.send_message(message, parse_mode=None)
+                    return await self.send_message_async(_html_to_plain(message), parse_mode=None)
                 return False
                 
         except Exception as e:
             logger.error(f"Telegram消息发送异常: {e}")
             return False
     
+    async def aclose(self):
+        """关闭异步HTTP客户端，应在创建它的事件循环结束前调用"""
+        if self._aclient is not None and self._aclient_loop is asyncio.get_running_loop():
+            await self._aclient.aclose()
+        self._aclient = None
+        self._aclient_loop = None
+    
+    @staticmethod
+    def _retry_after(response) -> int:
+        """从429响应中读取建议的等待秒数（Retry-After头或parameters.retry_after）"""
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None:
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after')
+            except ValueError:
+                retry_after = None
+        try:
+            retry_after = int(retry_after)
+        except (TypeError, ValueError):
+            retry_after = 1
+        return min(max(retry_after, 1), SEND_MAX_RETRY_AFTER)
+    
+    def _seen_recently(self, cache: OrderedDict, key) -> bool:
+        """
+        键在TTL内已发送过时返回True；否则记录本次发送并淘汰最旧的记录
+        
+        入队时即记录，发送中的相同消息也会被去重；发送失败时由_forget_recent移除
+        """
+        now = time.monotonic()
+        with self._dedupe_lock:
+            sent_at = cache.get(key)
+            if sent_at is not None and now - sent_at < DEDUPE_TTL:
+                return True
+            cache[key] = now
+            cache.move_to_end(key)
+            if len(cache) > DEDUPE_CACHE_SIZE:
+                cache.popitem(last=False)
+        return False
+    
+    def _forget_recent(self, cache: OrderedDict, key):
+        """移除发送失败的去重记录，使相同消息可以立即重发"""
+        with self._dedupe_lock:
+            cache.pop(key, None)
+    
     def send_signal_notification(self, signal_data: Dict[str, Any]) -> bool:
         """发送交易信号通知"""
         if not self.enabled:
@@ -224,32 +587,45 @@ class TelegramNotifier:
         
         # 获取当前信号评分
         current_score = signal_data.get('score', 0)
-        current_time = datetime.now()
+        current_time = time.monotonic()
         
         # 检查是否与上次发送的评分相同
-        if (self.last_signal_score is not None and 
-            abs(self.last_signal_score - current_score) < 0.001):  # 使用小阈值避免浮点数精度问题
+        if self._is_same_score(current_score):
             
             # 计算距离上次发送的时间间隔
-            if self.last_signal_time:
-                time_diff = (current_time - self.last_signal_time).total_seconds()
+            if self.last_signal_time is not None:
+                time_diff = current_time - self.last_signal_time
                 logger.debug(f"评分相同 ({current_score:.3f})，距离上次发送 {time_diff:.1f} 秒，跳过通知")
             else:
                 logger.debug(f"评分相同 ({current_score:.3f})，跳过通知")
             
             return True  # 返回True表示"成功"（跳过发送）
         
-        # 评分不同，发送通知
-        message = self._format_signal_message(signal_data)
-        success = self.send_message(message)
-        
-        if success:
-            # 更新缓存
-            self.last_signal_score = current_score
-            self.last_signal_time = current_time
-            logger.debug(f"发送信号通知，评分: {current_score:.3f}")
+        # 检查近期是否发送过相同方向、评分和来源的信号（评分来回跳动时不重复发送）
+        key = (signal_data.get('signal', 0), round(current_score, 3), signal_data.get('signal_from'))
+        if self._seen_recently(self._recent_signals, key):
+            logger.debug(f"近期已发送相同信号 ({current_score:.3f})，跳过通知")
+            return True
+        
+        # 评分不同，发送通知；评分缓存在后台线程发送成功后才更新，发送失败的信号下次仍会发送
+        def on_done(success):
+            if success:
+                self.last_signal_score = current_score
+                self.last_signal_time = current_time
+                logger.debug(f"发送信号通知，评分: {current_score:.3f}")
+            else:
+                self._forget_recent(self._recent_signals, key)
         
-        return success
+        message = self._format_signal_message(signal_data)
+        queued = self.send_message(message, on_done=on_done)
+        if not queued:
+            self._forget_recent(self._recent_signals, key)
+        return queued
+    
+    def _is_same_score(self, score: float) -> bool:
+        """评分是否与上次发送的相同（使用小阈值避免浮点数精度问题）"""
+        last_score = self.last_signal_score
+        return last_score is not None and abs(last_score - score) < 0.001
     
     def send_trade_notification(self, trade_data: Dict[str, Any]) -> bool:
         """发送交易执行通知"""
@@ -259,13 +635,30 @@ class TelegramNotifier:
         message = self._format_trade_message(trade_data)
         return self.send_message(message)
     
-    def send_status_notification(self, status_data: Dict[str, Any]) -> bool:
-        """发送状态通知"""
+    def send_status_notification(self, status_data: Dict[str, Any], priority: bool = False) -> bool:
+        """发送状态通知，priority为True时走高优先级通道"""
         if not self.enabled:
             return False
         
+        # 相同内容的错误/警告在TTL内只发送一次，发送失败时移除记录以便重发
+        on_done = None
+        if status_data.get('type') in DEDUPE_STATUS_TYPES:
+            digest = hashlib.sha1(
+                f"{status_data.get('title', '')}\0{status_data.get('content', '')}".encode('utf-8')
+            ).digest()
+            if self._seen_recently(self._recent_alerts, digest):
+                logger.debug("近期已发送相同告警，跳过通知")
+                return True
+            
+            def on_done(success):
+                if not success:
+                    self._forget_recent(self._recent_alerts, digest)
+        
         message = self._format_status_message(status_data)
-        return self.send_message(message)
+        queued = self.send_message(message, priority=priority, on_done=on_done)
+        if not queued and on_done is not None:
+            on_done(False)
+        return queued
     
     def send_error_notification(self, error_msg: str, context: str = "") -> bool:
         """发送错误通知"""
@@ -278,19 +671,26 @@ class TelegramNotifier:
             'content': f"错误信息: {error_msg}\n上下文: {context}" if context else error_msg
         }
         
-        return self.send_status_notification(status_data)
+        return self.send_status_notification(status_data, priority=True)
     
     def reset_score_cache(self):
         """重置评分缓存"""
         self.last_signal_score = None
         self.last_signal_time = None
+        with self._dedupe_lock:
+            self._recent_signals.clear()
+            self._recent_alerts.clear()
         logger.debug("评分缓存已重置")
     
     def get_last_score_info(self) -> Dict[str, Any]:
         """获取上次发送的评分信息"""
+        last_time = None
+        if self.last_signal_time is not None:
+            # 由monotonic间隔换算回墙钟时间
+            last_time = datetime.fromtimestamp(time.time() - (time.monotonic() - self.last_signal_time))
         return {
             'score': self.last_signal_score,
-            'time': self.last_signal_time
+            'time': last_time
         }
     
     def test_connection(self) -> bool:
@@ -299,12 +699,14 @@ class TelegramNotifier:
             print(" Telegram通知未配置")
             return False
         
-        test_message = f"🔧 <b>Telegram通知测试</b>\n\n"
-        test_message += f"✅ 连接测试成功！\n"
-        test_message += f"🚀 交易系统已准备就绪\n\n"
-        test_message += f"🕐 测试时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        test_message = (
+            "🔧 <b>Telegram通知测试</b>\n\n"
+            "✅ 连接测试成功！\n"
+            "🚀 交易系统已准备就绪\n\n"
+            f"🕐 测试时间: {_now_str()}"
+        )
         
-        success = self.send_message(test_message)
+        success = self._send_now(test_message, priority=True)
         
         if success:
             print(" Telegram通知测试成功")
@@ -313,12 +715,33 @@ class TelegramNotifier:
         
         return success
 
-# 全局通知器实例
-telegram_notifier = TelegramNotifier()
+# 全局通知器实例，首次发送通知时才创建（导入模块时不读取配置、不建立会话）
+_notifier = None
+_notifier_lock = threading.Lock()
+
+def _get_notifier() -> TelegramNotifier:
+    """返回全局通知器实例，不存在时创建"""
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                _notifier = TelegramNotifier()
+    return _notifier
+
+def __getattr__(name):
+    """兼容直接访问模块属性telegram_notifier的旧用法"""
+    if name == 'telegram_notifier':
+        return _get_notifier()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def notify_signal(signal: int, price: float, score: float, reason: str = "", investment_advice: str = "",
  signal_from: str = "unknown", notify_neutral: bool = None) -> bool:
     """快速发送信号通知"""
+    # 未启用时不构建通知数据
+    notifier = _get_notifier()
+    if not notifier.enabled:
+        return False
+    
     # 如果未指定notify_neutral，从配置中读取
     if notify_neutral is None:
         notify_neutral = TELEGRAM_CONFIG.get('NOTIFICATION_TYPES', {}).get('NEUTRAL_SIGNALS', False)
@@ -327,6 +750,10 @@ def notify_signal(signal: int, price: float, score: float, reason: str = "", inv
     if signal == 0 and not notify_neutral:
         return True
     
+    # 评分与上次相同的信号会被去重跳过，不再构建通知数据
+    if notifier._is_same_score(score):
+        return True
+    
     signal_data = {
         'signal': signal,
         'price': price, 
@@ -335,10 +762,14 @@ def notify_signal(signal: int, price: float, score: float, reason: str = "", inv
         'investment_advice': investment_advice,
         'signal_from': signal_from  # 新增：信号来源
     }
-    return telegram_notifier.send_signal_notification(signal_data)
+    return notifier.send_signal_notification(signal_data)
 
 def notify_trade(action: str, side: str, price: float, quantity: float, pnl: float = None, reason: str = "") -> bool:
     """快速发送交易通知"""
+    notifier = _get_notifier()
+    if not notifier.enabled:
+        return False
+    
     trade_data = {
         'action': action,
         'side': side,
@@ -347,28 +778,36 @@ def notify_trade(action: str, side: str, price: float, quantity: float, pnl: flo
         'pnl': pnl,
         'reason': reason
     }
-    return telegram_notifier.send_trade_notification(trade_data)
+    return notifier.send_trade_notification(trade_data)
 
 def notify_status(status_type: str, title: str, content: str) -> bool:
     """快速发送状态通知"""
+    notifier = _get_notifier()
+    if not notifier.enabled:
+        return False
+    
     status_data = {
         'type': status_type,
         'title': title,
         'content': content
     }
-    return telegram_notifier.send_status_notification(status_data)
+    return notifier.send_status_notification(status_data)
 
 def notify_error(error_msg: str, context: str = "") -> bool:
     """快速发送错误通知"""
-    return telegram_notifier.send_error_notification(error_msg, context)
+    notifier = _get_notifier()
+    if not notifier.enabled:
+        return False
+    
+    return notifier.send_error_notification(error_msg, context)
 
 def reset_signal_score_cache():
     """重置信号评分缓存"""
-    telegram_notifier.reset_score_cache()
+    _get_notifier().reset_score_cache()
 
 def get_last_signal_score_info() -> Dict[str, Any]:
     """获取上次发送的信号评分信息"""
-    return telegram_notifier.get_last_score_info()
+    return _get_notifier().get_last_score_info()
 
 if __name__ == "__main__":
     # 测试Telegram通知
@@ -5,10 +5,22 @@
 提供基于Web的交互式管理界面
 """
 
+# 直接运行本文件时，安装了gevent则在导入其他模块前打补丁，让socket/time.sleep等阻塞调用变为协程切换；
+# 由trading.py等导入时threading/ssl已经加载，此时打补丁不安全，保持threading模式
+if __name__ == '__main__':
+    try:
+        from gevent import monkey as gevent_monkey
+    except ImportError:
+        gevent_monkey = None
+    else:
+        gevent_monkey.patch_all()
+
 import os
 import sys
 import json
 import time
+import queue
+import hashlib
 import threading
 import random
 import subprocess
@@ -19,6 +31,11 @@ import tempfile
 from datetime import datetime, timedelta
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -31,6 +48,7 @@ try:
     from trading import TradingSystem
     from utils.telegram_notifier import notify_signal, notify_trade, notify_status, notify_error
     from web.socketio_config import SOCKETIO_CONFIG, SESSION_CONFIG, ERROR_HANDLING_CONFIG
+    from web.log_tailer import get_log_tailer, KEEPALIVE_INTERVAL, SSE_KEEPALIVE
 except ImportError as e:
     print(f"导入模块失败: {e}")
     print("请确保在项目根目录运行此脚本")
@@ -46,7 +64,28 @@ app.config['SESSION_COOKIE_SECURE'] = SESSION_CONFIG['session_cookie_secure']
 app.config['SESSION_COOKIE_HTTPONLY'] = SESSION_CONFIG['session_cookie_httponly']
 app.config['SESSION_COOKIE_SAMESITE'] = SESSION_CONFIG['session_cookie_samesite']
 
-socketio = SocketIO(app, **SOCKETIO_CONFIG)
+# orjson的序列化选项：允许非字符串键，numpy数值按数字输出
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+def _json_default(obj):
+    """orjson无法直接序列化的类型转为字符串"""
+    return str(obj)
+
+class _OrjsonCodec:
+    """SocketIO数据包的JSON编解码器，orjson在C中一次完成序列化，发送前无需逐层转换数据"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj, default=_json_default, option=_ORJSON_OPTIONS).decode('utf-8')
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+socketio_options = dict(SOCKETIO_CONFIG)
+if orjson is not None:
+    socketio_options['json'] = _OrjsonCodec
+socketio = SocketIO(app, **socketio_options)
 
 # 用户认证配置
 USERS = {
@@ -72,6 +111,12 @@ system_status = {
 data_push_thread = None
 data_push_running = False
 
+# 状态推送：内容未变化时不重复广播；启动/停止/配置等操作请求立即刷新，短窗口内的多次请求合并为一次
+STATUS_PUSH_INTERVAL = 120    # 定时刷新状态的间隔（秒）
+STATUS_BATCH_INTERVAL = 0.25  # 合并刷新请求的窗口（秒）
+last_status_hash = None
+status_refresh_requested = threading.Event()
+
 def ensure_json_serializable(data):
     """确保数据可以被JSON序列化"""
     if isinstance(data, dict):
@@ -85,6 +130,12 @@ def ensure_json_serializable(data):
     else:
         return str(data)
 
+def prepare_socket_data(data):
+    """SocketIO发送前的数据处理：使用orjson编解码器时原样返回，否则逐层转换为可序列化数据"""
+    if orjson is not None:
+        return data
+    return ensure_json_serializable(data)
+
 # SocketIO错误处理
 @socketio.on_error()
 def error_handler(e):
@@ -224,6 +275,21 @@ def validate_int(value, default=0, min_val=None, max_val=None):
     except (ValueError, TypeError):
         return default
 
+def get_trade_history(ts):
+    """获取最近交易记录的列表快照，交易线程同时追加记录时也可安全遍历"""
+    getter = getattr(ts, 'get_trade_history_snapshot', None)
+    if getter is not None:
+        return getter()
+    return list(getattr(ts, 'trade_history', []))
+
+def get_trade_stats(ts):
+    """获取按完整交易历史累计的交易统计（内存中只保留最近的交易记录）"""
+    getter = getattr(ts, 'get_trade_stats', None)
+    if getter is not None:
+        return getter()
+    return {'total_trades': 0, 'pnl_trades': 0, 'winning_trades': 0, 'losing_trades': 0,
+            'total_profit': 0.0, 'total_loss': 0.0}
+
 def safe_get_attr(obj, attr, default=None, converter=None):
     """安全获取对象属性"""
     try:
@@ -290,7 +356,7 @@ def update_system_status():
                 'start_time': ts.start_time.isoformat() if hasattr(ts, 'start_time') and ts.start_time else None,
                 'last_signal': getattr(ts, 'last_signal', None),
                 'last_trade': getattr(ts, 'last_trade', None),
-                'system_info': ensure_json_serializable(raw_system_info)
+                'system_info': prepare_socket_data(raw_system_info)
             })
             
             # 更新服务状态
@@ -314,6 +380,24 @@ def update_system_status():
             'service_detail': f'状态更新失败: {str(e)}'
         })
 
+def emit_status_if_changed(status):
+    """状态内容与上次广播的不同时才推送status_update"""
+    global last_status_hash
+    if orjson is not None:
+        payload = orjson.dumps(status, default=_json_default, option=_ORJSON_OPTIONS | orjson.OPT_SORT_KEYS)
+    else:
+        payload = json.dumps(status, sort_keys=True, default=str).encode('utf-8')
+    status_hash = hashlib.blake2b(payload, digest_size=8).digest()
+    if status_hash == last_status_hash:
+        return False
+    last_status_hash = status_hash
+    socketio.emit('status_update', status, namespace='/')
+    return True
+
+def request_status_refresh():
+    """请求推送线程立即刷新并广播状态（客户端通过status_update收到变化）"""
+    status_refresh_requested.set()
+
 def push_realtime_data():
     """推送核心实时数据到客户端 - 精简版本"""
     global data_push_running, system_status
@@ -329,8 +413,22 @@ def push_realtime_data():
     except Exception as e:
         print(f"数据推送线程：初始化TradingSystem失败: {e}")
     
+    next_push = 0.0
     while data_push_running:
         try:
+            # 每120秒刷新一次状态（大幅减少频率），内容未变化时不广播；
+            # 期间阻塞等待，有启动/停止/配置等操作请求刷新时提前唤醒
+            now = time.monotonic()
+            if now < next_push:
+                if not status_refresh_requested.wait(timeout=next_push - now):
+                    continue
+                if not data_push_running:
+                    break
+                # 短窗口内的多次刷新请求合并为一次
+                socketio.sleep(STATUS_BATCH_INTERVAL)
+            status_refresh_requested.clear()
+            next_push = time.monotonic() + STATUS_PUSH_INTERVAL
+            
             # 如果之前获取失败，再次尝试获取
             if ts is None:
                 try:
@@ -343,7 +441,7 @@ def push_realtime_data():
                 try:
                     # 更新并推送系统状态
                     update_system_status()
-                    socketio.emit('status_update', system_status, namespace='/')
+                    emit_status_if_changed(system_status)
                 except Exception as e:
                     print(f"推送系统状态失败: {e}")
             else:
@@ -353,13 +451,10 @@ def push_realtime_data():
                     'service_status': 'inactive',
                     'service_detail': '交易系统未运行'
                 }
-                socketio.emit('status_update', basic_status, namespace='/')
-            
-            # 每120秒推送一次数据（大幅减少频率）
-            time.sleep(120)
+                emit_status_if_changed(basic_status)
         except Exception as e:
             print(f"推送线程错误: {e}")
-            time.sleep(15)
+            socketio.sleep(15)
 
 def start_data_push():
     """启动数据推送线程"""
@@ -367,14 +462,16 @@ def start_data_push():
     
     if not data_push_running:
         data_push_running = True
-        data_push_thread = threading.Thread(target=push_realtime_data, daemon=True)
-        data_push_thread.start()
+        # 由SocketIO按当前异步模式启动（gevent模式下为协程，threading模式下为守护线程）
+        data_push_thread = socketio.start_background_task(push_realtime_data)
         print(" 实时数据推送线程已启动")
 
 def stop_data_push():
     """停止数据推送线程"""
     global data_push_running
     data_push_running = False
+    # 唤醒正在等待的推送线程使其退出
+    status_refresh_requested.set()
     print("⏹️ 实时数据推送线程已停止")
 
 # 登录验证装饰器
@@ -441,7 +538,7 @@ def index():
         # 获取基础统计数据（用于初始页面渲染）
         dashboard_data = {
             'system_running': system_running,
-            'total_trades': len(getattr(ts, 'trade_history', [])),
+            'total_trades': get_trade_stats(ts)['total_trades'],
             'daily_trades': getattr(ts, 'daily_trades', 0),
             'current_capital': getattr(ts, 'current_capital', 10000.0),
             'total_pnl': getattr(ts, 'total_pnl', 0.0),
@@ -521,6 +618,7 @@ def api_start():
         success, message = ts.start()
         if success:
             update_system_status()
+            request_status_refresh()
             return jsonify({'success': True, 'message': f'交易系统启动成功: {message}'})
         else:
             return jsonify({'success': False, 'message': f'启动失败: {message}'})
@@ -555,6 +653,7 @@ def api_stop():
         success, message = ts.stop(force_close_position=False)
         if success:
             update_system_status()
+            request_status_refresh()
             return jsonify({'success': True, 'message': f'交易系统停止成功（保持仓位）: {message}'})
         else:
             return jsonify({'success': False, 'message': f'停止失败: {message}'})
@@ -583,7 +682,7 @@ def api_status_check():
             'total_pnl': validate_float(safe_get_attr(ts, 'total_pnl'), 0),
             'daily_pnl': validate_float(safe_get_attr(ts, 'daily_pnl'), 0),
             'current_position': validate_int(safe_get_attr(ts, 'current_position'), 0),
-            'trade_count': len(safe_get_attr(ts, 'trade_history', [])),
+            'trade_count': get_trade_stats(ts)['total_trades'],
             'symbol': safe_get_attr(ts, 'symbol', 'ETHUSDT'),
             'timeframe': safe_get_attr(ts, 'timeframe', '1h')
         }
@@ -645,9 +744,6 @@ def api_logs_follow():
                 yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
                 return
             
-            # 获取初始文件大小
-            last_size = os.path.getsize(log_file_path)
-            
             # 发送开始消
             start_data = {
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -657,63 +753,19 @@ def api_logs_follow():
             }
             yield f"data: {json.dumps(start_data, ensure_ascii=False)}\n\n"
             
-            # 监控日志文件变化
-            while True:
-                try:
-                    current_size = os.path.getsize(log_file_path)
-                    
-                    if current_size > last_size:
-                        # 读取新增的日志行
-                        with open(log_file_path, 'r', encoding='utf-8') as f:
-                            f.seek(last_size)
-                            new_lines = f.readlines()
-                        
-                        for line in new_lines:
-                            if line.strip():
-                                try:
-                                    # 解析日志格式: 2024-01-01 12:00:00,123 - TradingSystem - INFO - 消息内容
-                                    parts = line.strip().split(' - ', 3)
-                                    if len(parts) >= 4:
-                                        timestamp = parts[0]
-                                        module = parts[1]
-                                        level = parts[2]
-                                        message = parts[3]
-                                        
-                                        log_data = {
-                                            'timestamp': timestamp,
-                                            'level': level,
-                                            'message': message,
-                                            'module': module
-                                        }
-                                    else:
-                                        # 简单格式处
-                                        log_data = {
-                                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                                            'level': 'INFO',
-                                            'message': line.strip(),
-                                            'module': 'TradingSystem'
-                                        }
-                                    
-                                    yield f"data: {json.dumps(log_data, ensure_ascii=False)}\n\n"
-                                except Exception as e:
-                                    continue
-                        
-                        last_size = current_size
-                    
-                    # 检查文件是否被重新创建（日志轮转）
-                    if current_size < last_size:
-                        last_size = 0
-                    
-                    time.sleep(1)  # 每秒检查一
-                except Exception as e:
-                    error_data = {
-                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'level': 'ERROR',
-                        'message': f'监控日志文件时出{str(e)}',
-                        'module': 'WebAPI'
-                    }
-                    yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
-                    time.sleep(5)  # 出错后等秒再继续
+            # 同一日志文件由共享的后台任务跟踪，这里只接收分发来的新日志
+            tailer = get_log_tailer(log_file_path, socketio.start_background_task, socketio.sleep)
+            log_queue = tailer.subscribe()
+            try:
+                while True:
+                    try:
+                        yield log_queue.get(timeout=KEEPALIVE_INTERVAL)
+                    except queue.Empty:
+                        # 日志长时间无变化时也定期写入，客户端已断开时由写入失败触发注销
+                        yield SSE_KEEPALIVE
+            finally:
+                # 客户端断开（GeneratorExit）时注销订阅
+                tailer.unsubscribe(log_queue)
                     
         except Exception as e:
             error_data = {
@@ -779,6 +831,7 @@ def api_update_config():
         success = update_config_values(new_config)
         
         if success:
+            request_status_refresh()
             # 同时更新策略数据
             ts = get_trading_system()
             if ts and hasattr(ts, 'strategy') and ts.strategy is not None:
@@ -960,12 +1013,12 @@ def handle_request_position():
             # 获取持仓信息（使用优化后的API逻辑
             position_info = {}
             if hasattr(ts, 'get_position_info'):
-                position_info = ensure_json_serializable(ts.get_position_info())
+                position_info = prepare_socket_data(ts.get_position_info())
             
             # 获取盈亏信息
             pnl_info = {}
             if hasattr(ts, 'get_current_pnl_info'):
-                pnl_info = ensure_json_serializable(ts.get_current_pnl_info())
+                pnl_info = prepare_socket_data(ts.get_current_pnl_info())
             
             # 获取当前市场价格
             current_price = 0
@@ -1064,7 +1117,7 @@ def handle_request_trades():
         ts = get_trading_system()
         if ts:
             # 获取最近的交易记录（最'0条）
-            trades = getattr(ts, 'trade_history', [])
+            trades = get_trade_history(ts)
             recent_trades = []
             
             for trade in trades[-10:]:  # 最10条
@@ -1214,8 +1267,9 @@ def api_get_trades():
         trades_data = []
         
         # 获取交易历史
-        if hasattr(ts, 'trade_history') and ts.trade_history:
-            for trade in ts.trade_history:
+        trade_history = get_trade_history(ts)
+        if trade_history:
+            for trade in trade_history:
                 # 格式化交易记录
                 trade_type = trade.get('type', 'UNKNOWN')
                 is_long = trade_type.upper() in ['BUY', 'LONG', '买入', '开多']
@@ -1324,24 +1378,15 @@ def api_get_account():
         risk_level = 'LOW' if margin_ratio < 30 else 'MEDIUM' if margin_ratio < 60 else 'HIGH'
         
         # 交易统计
-        trade_history = getattr(ts, 'trade_history', [])
-        trade_count = len(trade_history)
+        trade_stats = get_trade_stats(ts)
+        trade_count = trade_stats['total_trades']
         daily_trades = getattr(ts, 'daily_trades', 0)
         
-        # 计算交易统计
-        winning_trades = 0
-        losing_trades = 0
-        total_profit = 0.0
-        total_loss = 0.0
-        
-        for trade in trade_history:
-            if 'pnl' in trade and trade['pnl'] is not None:
-                if trade['pnl'] > 0:
-                    winning_trades += 1
-                    total_profit += trade['pnl']
-                else:
-                    losing_trades += 1
-                    total_loss += abs(trade['pnl'])
+        # 计算交易统计（按完整交易历史累计，盈亏为0的交易计入亏损笔数）
+        winning_trades = trade_stats['winning_trades']
+        losing_trades = trade_stats['pnl_trades'] - winning_trades
+        total_profit = trade_stats['total_profit']
+        total_loss = trade_stats['total_loss']
         
         win_rate = (winning_trades / trade_count * 100) if trade_count > 0 else 0
         profit_factor = (total_profit / total_loss) if total_loss > 0 else float('inf')
@@ -1452,19 +1497,13 @@ def api_get_dashboard():
         daily_return = (daily_pnl / initial_capital * 100) if initial_capital > 0 else 0
         
         # 交易统计
-        trade_history = getattr(ts, 'trade_history', [])
-        total_trades = len(trade_history)
+        trade_stats = get_trade_stats(ts)
+        total_trades = trade_stats['total_trades']
         daily_trades = getattr(ts, 'daily_trades', 0)
         
-        # 计算胜率
-        winning_trades = 0
-        losing_trades = 0
-        for trade in trade_history:
-            if 'pnl' in trade and trade['pnl'] is not None:
-                if trade['pnl'] > 0:
-                    winning_trades += 1
-                elif trade['pnl'] < 0:
-                    losing_trades += 1
+        # 计算胜率（按完整交易历史累计）
+        winning_trades = trade_stats['winning_trades']
+        losing_trades = trade_stats['losing_trades']
         
         win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
         
@@ -1600,19 +1639,13 @@ def api_get_dashboard_public():
         daily_return = (daily_pnl / initial_capital * 100) if initial_capital > 0 else 0
         
         # 交易统计
-        trade_history = getattr(ts, 'trade_history', [])
-        total_trades = len(trade_history)
+        trade_stats = get_trade_stats(ts)
+        total_trades = trade_stats['total_trades']
         daily_trades = getattr(ts, 'daily_trades', 0)
         
-        # 计算胜率
-        winning_trades = 0
-        losing_trades = 0
-        for trade in trade_history:
-            if 'pnl' in trade and trade['pnl'] is not None:
-                if trade['pnl'] > 0:
-                    winning_trades += 1
-                elif trade['pnl'] < 0:
-                    losing_trades += 1
+        # 计算胜率（按完整交易历史累计）
+        winning_trades = trade_stats['winning_trades']
+        losing_trades = trade_stats['losing_trades']
         
         win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
         
@@ -2057,7 +2090,8 @@ def api_get_trade_stats():
         ts = get_trading_system()
         
         # 获取交易历史和PnL信息
-        trades = getattr(ts, 'trade_history', [])
+        trades = get_trade_history(ts)
+        trade_stats = get_trade_stats(ts)
         
         # 获取系统PnL数据
         pnl_info = {}
@@ -2071,18 +2105,18 @@ def api_get_trade_stats():
         daily_pnl = pnl_info.get('daily_pnl', getattr(ts, 'daily_pnl', 0.0))
         
         # 基础交易统计
-        total_trades = len(trades)
+        total_trades = trade_stats['total_trades']
         daily_trades = getattr(ts, 'daily_trades', 0)
         
         # 分析交易记录中的PnL（如果有）
         trade_pnls = [t.get('pnl', 0) for t in trades if 'pnl' in t and t.get('pnl') is not None]
         
         if trade_pnls:
-            # 基于交易记录的统计
-            winning_trades = len([pnl for pnl in trade_pnls if pnl > 0])
-            losing_trades = len([pnl for pnl in trade_pnls if pnl < 0])
-            total_profit = sum([pnl for pnl in trade_pnls if pnl > 0])
-            total_loss = sum([pnl for pnl in trade_pnls if pnl < 0])
+            # 笔数与盈亏金额按完整交易历史累计，最大单笔盈亏和回撤基于内存中的最近记录
+            winning_trades = trade_stats['winning_trades']
+            losing_trades = trade_stats['losing_trades']
+            total_profit = trade_stats['total_profit']
+            total_loss = -trade_stats['total_loss']
             
             # 平均盈亏
             avg_win = total_profit / winning_trades if winning_trades > 0 else 0
@@ -2117,7 +2151,7 @@ def api_get_trade_stats():
             max_drawdown = 0
         
         # 计算胜率和盈亏比
-        win_rate = (winning_trades / len(trade_pnls) * 100) if trade_pnls else 0
+        win_rate = (winning_trades / trade_stats['pnl_trades'] * 100) if trade_pnls else 0
         profit_factor = abs(total_profit / total_loss) if total_loss != 0 else float('inf')
         
         # 计算收益
@@ -2191,7 +2225,8 @@ def api_get_trade_stats_public():
         ts = get_trading_system()
         
         # 获取交易历史和PnL信息
-        trades = getattr(ts, 'trade_history', [])
+        trades = get_trade_history(ts)
+        trade_stats = get_trade_stats(ts)
         
         # 获取系统PnL数据
         pnl_info = {}
@@ -2205,18 +2240,18 @@ def api_get_trade_stats_public():
         daily_pnl = pnl_info.get('daily_pnl', getattr(ts, 'daily_pnl', 0.0))
         
         # 基础交易统计
-        total_trades = len(trades)
+        total_trades = trade_stats['total_trades']
         daily_trades = getattr(ts, 'daily_trades', 0)
         
         # 分析交易记录中的PnL（如果有）
         trade_pnls = [t.get('pnl', 0) for t in trades if 'pnl' in t and t.get('pnl') is not None]
         
         if trade_pnls:
-            # 基于交易记录的统计
-            winning_trades = len([pnl for pnl in trade_pnls if pnl > 0])
-            losing_trades = len([pnl for pnl in trade_pnls if pnl < 0])
-            total_profit = sum([pnl for pnl in trade_pnls if pnl > 0])
-            total_loss = sum([pnl for pnl in trade_pnls if pnl < 0])
+            # 笔数与盈亏金额按完整交易历史累计，最大单笔盈亏和回撤基于内存中的最近记录
+            winning_trades = trade_stats['winning_trades']
+            losing_trades = trade_stats['losing_trades']
+            total_profit = trade_stats['total_profit']
+            total_loss = -trade_stats['total_loss']
             
             # 平均盈亏
             avg_win = total_profit / winning_trades if winning_trades > 0 else 0
@@ -2251,7 +2286,7 @@ def api_get_trade_stats_public():
             max_drawdown = 0
         
         # 计算胜率和盈亏比
-        win_rate = (winning_trades / len(trade_pnls) * 100) if trade_pnls else 0
+        win_rate = (winning_trades / trade_stats['pnl_trades'] * 100) if trade_pnls else 0
         profit_factor = abs(total_profit / total_loss) if total_loss != 0 else float('inf')
         
         # 计算收益率
@@ -2725,6 +2760,9 @@ def update_config_values(new_config):
             success, message = save_user_config(config_to_save)
             if success:
                 print(f"✅ 配置已保存到用户配置文件: {message}")
+                # 刷新交易系统的配置快照，使新配置在交易路径上生效
+                if hasattr(ts, 'reload_config'):
+                    ts.reload_config()
             else:
                 print(f"❌ 保存配置失败: {message}")
         except Exception as e:
@@ -2764,16 +2802,21 @@ def main():
     # 启动实时数据推送线程
     start_data_push()
     
+    # gevent模式下由gevent的WSGI服务器运行，Werkzeug专用参数只在threading模式下传入
+    run_kwargs = {}
+    if SOCKETIO_CONFIG['async_mode'] == 'threading':
+        run_kwargs['allow_unsafe_werkzeug'] = True
+    
     try:
         # 在调试模式下禁用多进程，避免重复创建TradingSystem实例
         if args.debug:
             print("🔧 调试模式：禁用多进程以避免重复初始化")
             socketio.run(app, host=args.host, port=args.port, debug=args.debug, 
-                        allow_unsafe_werkzeug=True, use_reloader=False)
+                        use_reloader=False, **run_kwargs)
         else:
             # 在生产环境中允许使用Werkzeug服务
             socketio.run(app, host=args.host, port=args.port, debug=args.debug, 
-                        allow_unsafe_werkzeug=True)
+                        **run_kwargs)
     except KeyboardInterrupt:
         print("\n🛑 Web界面已停止")
         stop_data_push()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+日志文件共享跟踪器
+
+每个日志文件只由一个后台任务读取新增内容，解析后分发给所有订阅的SSE连接。
+安装了inotify_simple（Linux）时等待文件系统事件，未安装时每秒检查一次文件大小。
+"""
+
+import os
+import re
+import json
+import time
+import queue
+import select
+import threading
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+    inotify_flags = None
+
+# 无事件时的最长等待时间（秒），也是未安装inotify_simple时的轮询间隔
+POLL_INTERVAL = 1.0
+# 读取出错后的等待时间（秒）
+ERROR_RETRY_DELAY = 5
+# 每个订阅连接最多缓存的日志条数，客户端跟不上时丢弃新日志
+SUBSCRIBER_QUEUE_SIZE = 1024
+# 订阅连接无新日志时发送保活注释的间隔（秒），客户端断开后下一次写入即可发现
+KEEPALIVE_INTERVAL = 15
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+# 日志格式: 时间 - 模块 - 级别 - 消息，与按' - '切分前三段的结果一致
+_LOG_RE = re.compile(rb'^(.*?) - (.*?) - (.*?) - (.*)$')
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+
+def format_sse(data):
+    """把日志数据编码为一条SSE消息（bytes），安装了orjson时使用orjson序列化"""
+    if orjson is not None:
+        return _SSE_PREFIX + orjson.dumps(data) + _SSE_SUFFIX
+    return _SSE_PREFIX + json.dumps(data, ensure_ascii=False).encode('utf-8') + _SSE_SUFFIX
+
+
+def make_log_event(level, message, module='WebAPI'):
+    """构造Web接口自身产生的日志数据"""
+    return {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'level': level,
+        'message': message,
+        'module': module
+    }
+
+
+def parse_log_line(line):
+    """解析日志行（bytes）: 2024-01-01 12:00:00,123 - TradingSystem - INFO - 消息内容"""
+    match = _LOG_RE.match(line)
+    if match is not None:
+        timestamp, module, level, message = (part.decode('utf-8', 'replace') for part in match.groups())
+        return {
+            'timestamp': timestamp,
+            'level': level,
+            'message': message,
+            'module': module
+        }
+    # 简单格式处理
+    return make_log_event('INFO', line.decode('utf-8', 'replace'), 'TradingSystem')
+
+
+class LogTailer:
+    """单个日志文件的共享跟踪器"""
+
+    def __init__(self, path, start_task=None, sleep=None):
+        """
+        Args:
+            path: 日志文件路径
+            start_task: 启动后台任务的函数，默认使用守护线程（Web界面传入socketio.start_background_task）
+            sleep: 后台任务使用的等待函数，默认time.sleep（Web界面传入socketio.sleep）
+        """
+        self.path = path
+        self._start_task = start_task or self._start_thread
+        self._sleep = sleep or time.sleep
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._running = False
+        # 已读取到的文件位置，由所有订阅连接共享
+        self._offset = 0
+
+    @staticmethod
+    def _start_thread(target):
+        thread = threading.Thread(target=target, name='LogTailer', daemon=True)
+        thread.start()
+        return thread
+
+    def subscribe(self):
+        """注册一个订阅连接，返回接收SSE消息的队列；没有运行中的后台任务时启动"""
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(q)
+            if self._running:
+                return q
+            self._running = True
+            # 新一轮跟踪只推送订阅之后新增的日志
+            try:
+                self._offset = os.path.getsize(self.path)
+            except OSError:
+                self._offset = 0
+        self._start_task(self._run)
+        return q
+
+    def unsubscribe(self, q):
+        """注销订阅连接，没有订阅者时后台任务自行退出"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _broadcast(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass
+
+    def _open_inotify(self):
+        """监听日志目录的修改/创建事件（目录级监听可覆盖日志轮转），不可用时返回None"""
+        if INotify is None:
+            return None
+        try:
+            inotify = INotify()
+            inotify.add_watch(os.path.dirname(os.path.abspath(self.path)),
+                              inotify_flags.MODIFY | inotify_flags.CREATE)
+            return inotify
+        except OSError:
+            return None
+
+    def _wait(self, inotify):
+        """等待文件变化或超时"""
+        if inotify is None:
+            self._sleep(POLL_INTERVAL)
+            return
+        # select在gevent打补丁后为协程等待，不阻塞其他连接
+        readable, _, _ = select.select([inotify.fileno()], [], [], POLL_INTERVAL)
+        if readable:
+            inotify.read(timeout=0)
+
+    def _read_new_lines(self):
+        """读取并分发上次位置之后新增的日志行"""
+        current_size = os.path.getsize(self.path)
+        # 文件变小说明被重新创建（日志轮转）
+        if current_size < self._offset:
+            self._offset = 0
+        if current_size == self._offset:
+            return
+
+        # 按字节读取，只解码匹配出的字段
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            new_lines = f.readlines()
+            self._offset = f.tell()
+
+        for line in new_lines:
+            line = line.strip()
+            if line:
+                # 每行只解析、编码一次，所有订阅连接共用
+                self._broadcast(format_sse(parse_log_line(line)))
+
+    def _run(self):
+        inotify = self._open_inotify()
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._running = False
+                        return
+                try:
+                    self._wait(inotify)
+                    self._read_new_lines()
+                except Exception as e:
+                    self._broadcast(format_sse(make_log_event('ERROR', f'监控日志文件时出错: {e}')))
+                    self._sleep(ERROR_RETRY_DELAY)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+
+_tailers = {}
+_tailers_lock = threading.Lock()
+
+
+def get_log_tailer(path, start_task=None, sleep=None):
+    """返回指定日志文件的共享跟踪器，不存在时创建"""
+    path = os.path.abspath(path)
+    with _tailers_lock:
+        tailer = _tailers.get(path)
+        if tailer is None:
+            tailer = LogTailer(path, start_task, sleep)
+            _tailers[path] = tailer
+        return tailer
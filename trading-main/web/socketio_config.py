@@ -3,6 +3,14 @@
 SocketIO配置管理
 """
 
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent_monkey = None
+
+# 只有入口处已在导入其他模块前完成gevent补丁时才能使用gevent模式
+GEVENT_PATCHED = gevent_monkey is not None and gevent_monkey.is_module_patched('socket')
+
 # SocketIO配置
 SOCKETIO_CONFIG = {
     'cors_allowed_origins': "*",
@@ -11,7 +19,8 @@ SOCKETIO_CONFIG = {
     'max_http_buffer_size': 1e8,  # 最大HTTP缓冲区大小
     'logger': True,               # 启用日志
     'engineio_logger': True,      # 启用Engine.IO日志
-    'async_mode': 'threading',    # 异步模式
+    # 异步模式：已完成gevent补丁时使用协程处理并发连接，否则使用线程
+    'async_mode': 'gevent' if GEVENT_PATCHED else 'threading',
     'cors_credentials': True,     # 允许跨域凭证
 }
 